@@ -0,0 +1,150 @@
+"""Compare the prompts the pipeline sends with the previous JSON data encoding against the compact encoding.
+
+Usage:
+    python benchmarks/prompt_encoding.py                # synthetic FMP-shaped payloads, default questions
+    python benchmarks/prompt_encoding.py AAPL MSFT      # latest raw_data rows and questions from the database
+
+Each symbol's indicators and timeframe summaries are computed in one batch as in
+run_pipeline, its questions are grouped by model tier, and every group prompt is
+built with build_group_prompt, the function analyze_question_group uses. The
+counts are per symbol, summed over its tier prompts. "prompt" counts the whole
+prompt (template, legend, questions and data) and "data" counts only the data
+section. Both encodings use the same template. Token counts use tiktoken's
+cl100k_base when it is installed, otherwise the ~4 characters per token
+estimate used by groq_analyzer.
+"""
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_LIMITS, INDICATOR_CONFIG, PROMPT_CONFIG
+from data_extraction.history import history_columns
+from database.questions_handler import DEFAULT_QUESTIONS
+from llm_analysis.groq_analyzer import build_group_prompt
+from llm_analysis.indicators import compute_universe_indicators
+from llm_analysis.model_router import group_questions
+from llm_analysis.timeframes import compute_universe_timeframes
+
+def get_token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding('cl100k_base')
+        return lambda text: len(encoding.encode(text)), 'cl100k_base'
+    except Exception:
+        return lambda text: len(text) // 4, 'chars/4 estimate'
+
+def synthetic_payload(symbol, days=None, seed=0):
+    """Build an FMP-shaped quote + historical payload (weekdays, newest first) with realistic float precision"""
+    rng = random.Random(f"{symbol}-{seed}")
+    days = days or DATA_LIMITS['historical_days']
+    price = rng.uniform(20, 900)
+    
+    dates = []
+    day = date(2025, 7, 15)
+    while len(dates) < days:
+        if day.weekday() < 5:
+            dates.append(day)
+        day -= timedelta(days=1)
+    
+    historical = []
+    for day in reversed(dates):
+        close = price * (1 + rng.gauss(0, 0.015))
+        change = close - price
+        historical.append({
+            'date': day.isoformat(),
+            'open': round(price * (1 + rng.gauss(0, 0.005)), 6),
+            'high': round(close * 1.012, 6),
+            'low': round(close * 0.988, 6),
+            'close': round(close, 6),
+            'volume': rng.randint(1_000_000, 90_000_000),
+            'change': round(change, 6),
+            'changePercent': round(change / price * 100, 5)
+        })
+        price = close
+    historical.reverse()
+    
+    quote = {
+        'symbol': symbol, 'name': f"{symbol} Inc.", 'price': round(price, 4),
+        'change': round(rng.gauss(0, 2), 4), 'changesPercentage': round(rng.gauss(0, 1), 5),
+        'dayLow': round(price * 0.99, 4), 'dayHigh': round(price * 1.01, 4),
+        'yearHigh': round(price * 1.3, 4), 'yearLow': round(price * 0.7, 4),
+        'marketCap': rng.randint(10**10, 3 * 10**12), 'volume': rng.randint(10**6, 9 * 10**7),
+        'avgVolume': rng.randint(10**6, 9 * 10**7), 'open': round(price, 4),
+        'previousClose': round(price, 4), 'eps': round(rng.uniform(0.5, 12), 4),
+        'pe': round(rng.uniform(8, 60), 4), 'exchange': 'NASDAQ',
+        'priceAvg50': round(price * 0.97, 6), 'priceAvg200': round(price * 0.92, 6),
+        'sharesOutstanding': rng.randint(10**8, 10**10)
+    }
+    return {'symbol': symbol, 'quote': quote, 'historical': {'symbol': symbol, 'historical': historical}}
+
+def load_payloads(symbols):
+    if not symbols:
+        from config import STOCK_SYMBOLS
+        return [(symbol, synthetic_payload(symbol)) for symbol in STOCK_SYMBOLS]
+    
+    from database.raw_data_handler import get_combined_raw_data
+    return [(symbol, get_combined_raw_data(symbol)) for symbol in symbols]
+
+def load_questions(symbols):
+    if not symbols:
+        return [{'id': i, 'question_text': text} for i, text in enumerate(DEFAULT_QUESTIONS, 1)]
+    
+    from database.questions_handler import get_all_questions
+    return get_all_questions()
+
+def load_benchmark(symbols):
+    """Synthetic benchmark history for beta; stored payloads are compared without it"""
+    if symbols:
+        return None
+    return history_columns(synthetic_payload(INDICATOR_CONFIG['benchmark_symbol'])['historical'])
+
+def group_prompts(symbol, raw_data, indicators, timeframes, questions, encoding):
+    """Every tier prompt analyze_stock_batch_groq would send for the symbol"""
+    PROMPT_CONFIG['encoding'] = encoding
+    return [build_group_prompt(symbol, raw_data, indicators, group, timeframes)
+            for group in group_questions(questions).values()]
+
+def data_section(prompt):
+    return prompt.rsplit('\nData:\n', 1)[-1]
+
+def main(symbols):
+    count_tokens, tokenizer = get_token_counter()
+    questions = load_questions(symbols)
+    payloads = [(symbol, raw_data) for symbol, raw_data in load_payloads(symbols) if raw_data]
+    histories = {symbol: history_columns(raw_data.get('historical')) for symbol, raw_data in payloads}
+    indicators = compute_universe_indicators(histories, load_benchmark(symbols))
+    timeframes = compute_universe_timeframes(histories)
+    encoding = PROMPT_CONFIG['encoding']
+    
+    print(f"Tokenizer: {tokenizer}, {len(questions)} questions in {len(group_questions(questions))} tier prompts per symbol")
+    print(f"{'symbol':<8}{'prompt json':>12}{'compact':>9}{'saving':>8}{'data json':>11}{'compact':>9}{'saving':>8}")
+    
+    totals = [0, 0, 0, 0]
+    for symbol, raw_data in payloads:
+        prompts = {
+            name: group_prompts(symbol, raw_data, indicators.get(symbol), timeframes.get(symbol), questions, name)
+            for name in ('json', 'compact')
+        }
+        counts = [
+            sum(count_tokens(prompt) for prompt in prompts['json']),
+            sum(count_tokens(prompt) for prompt in prompts['compact']),
+            sum(count_tokens(data_section(prompt)) for prompt in prompts['json']),
+            sum(count_tokens(data_section(prompt)) for prompt in prompts['compact'])
+        ]
+        totals = [total + count for total, count in zip(totals, counts)]
+        print(format_row(symbol, counts))
+    
+    PROMPT_CONFIG['encoding'] = encoding
+    if totals[0]:
+        print(format_row('total', totals))
+
+def format_row(name, counts):
+    prompt_json, prompt_compact, data_json, data_compact = counts
+    return (f"{name:<8}{prompt_json:>12}{prompt_compact:>9}{1 - prompt_compact / prompt_json:>8.1%}"
+            f"{data_json:>11}{data_compact:>9}{1 - data_compact / data_json:>8.1%}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
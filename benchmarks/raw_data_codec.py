@@ -0,0 +1,119 @@
+"""Compare raw_data payload codecs: stored size, encode/decode throughput and database round trips.
+
+Usage:
+    python benchmarks/raw_data_codec.py                 # synthetic payloads in the stored (columnar) format
+    python benchmarks/raw_data_codec.py --days 60       # shorter price history per payload
+    python benchmarks/raw_data_codec.py --db            # also time insert/read through raw_data_handler
+
+--db writes to a temporary SQLite database unless STORAGE_BACKEND is set, so it
+never touches production data by default.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if '--db' in sys.argv and 'STORAGE_BACKEND' not in os.environ:
+    os.environ['STORAGE_BACKEND'] = 'sqlite'
+    os.environ['SQLITE_PATH'] = os.path.join(tempfile.mkdtemp(), 'raw_data_codec.db')
+
+import database.raw_data_handler as raw_data_handler
+from config import DATA_LIMITS, RAW_DATA_CONFIG, STOCK_SYMBOLS
+from data_extraction.history import HistoryColumns
+from prompt_encoding import synthetic_payload
+
+CODECS = ['json', 'zlib', 'zstd', 'zstd+dict']
+
+def use_codec(codec, dictionary):
+    """Point the handler at a codec; the trained dictionary is injected instead of stored"""
+    RAW_DATA_CONFIG['codec'] = 'zstd' if codec.startswith('zstd') else codec
+    RAW_DATA_CONFIG['use_dictionary'] = codec == 'zstd+dict'
+    if dictionary is not None:
+        raw_data_handler._dictionaries[dictionary.dict_id()] = dictionary
+        raw_data_handler._current_dictionary = (dictionary.dict_id(), dictionary) if codec == 'zstd+dict' else (None, None)
+
+def stored_payload(symbol, days, seed=0):
+    """A synthetic payload as the fetcher hands it to insert_raw_data: history as columns of arrays"""
+    payload = synthetic_payload(symbol, days, seed)
+    columns = HistoryColumns()
+    for record in payload['historical']['historical']:
+        columns.append(record)
+    return dict(payload, historical=columns.to_payload(symbol))
+
+def train(payloads):
+    """Train the way train_payload_dictionary does, on the payloads' sections and history columns"""
+    zstd = raw_data_handler.get_zstd()
+    if zstd is None:
+        return None
+    samples = [sample for payload in payloads
+               for sample in raw_data_handler.payload_samples(raw_data_handler.convert_data(payload))]
+    return zstd.train_dictionary(RAW_DATA_CONFIG['dictionary_size'], samples)
+
+def bench_codec(payloads, json_bytes):
+    """Returns (stored bytes, encode MB/s, decode MB/s) measured on JSON-equivalent input size"""
+    start = time.perf_counter()
+    encoded = [raw_data_handler.encode_payload(payload) for payload in payloads]
+    encode_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for payload, codec in encoded:
+        raw_data_handler.decode_payload(payload, codec)
+    decode_seconds = time.perf_counter() - start
+
+    stored = sum(len(payload) for payload, _ in encoded)
+    return stored, json_bytes / encode_seconds / 1e6, json_bytes / decode_seconds / 1e6
+
+def bench_database(symbols, payloads):
+    """Returns (inserts/s, reads/s) through insert_raw_data and get_latest_raw_data"""
+    start = time.perf_counter()
+    for symbol, payload in zip(symbols, payloads):
+        raw_data_handler.insert_raw_data(symbol, 'benchmark', payload)
+    write_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for symbol in symbols:
+        raw_data_handler.get_latest_raw_data(symbol)
+    read_seconds = time.perf_counter() - start
+    return len(symbols) / write_seconds, len(symbols) / read_seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=200, help="payloads per codec")
+    parser.add_argument('--days', type=int, default=DATA_LIMITS['historical_days'], help="price history days per payload")
+    parser.add_argument('--db', action='store_true', help="also time database writes and reads")
+    args = parser.parse_args()
+
+    symbols = [f"{STOCK_SYMBOLS[i % len(STOCK_SYMBOLS)]}{i}" for i in range(args.count)]
+    payloads = [stored_payload(symbol, args.days) for symbol in symbols]
+    training = [stored_payload(f"TRAIN{i}", args.days, seed=1) for i in range(100)]
+    dictionary = train(training)
+    json_bytes = sum(len(json.dumps(raw_data_handler.convert_data(payload), separators=(',', ':'))) for payload in payloads)
+
+    if args.db:
+        from database.stocks_handler import bulk_upsert_stocks
+        bulk_upsert_stocks([{'symbol': symbol} for symbol in symbols])
+        print(f"Database: {os.environ.get('STORAGE_BACKEND', 'postgres')} {os.environ.get('SQLITE_PATH', '')}")
+
+    print(f"{args.count} payloads x {args.days} days, {json_bytes / args.count / 1024:.1f} KiB JSON each")
+    header = f"{'codec':<11}{'stored KiB':>11}{'ratio':>8}{'enc MB/s':>10}{'dec MB/s':>10}"
+    print(header + (f"{'writes/s':>10}{'reads/s':>9}" if args.db else ''))
+
+    for codec in CODECS:
+        if codec.startswith('zstd') and (raw_data_handler.get_zstd() is None or dictionary is None):
+            print(f"{codec:<11}{'zstandard not installed':>30}")
+            continue
+
+        use_codec(codec, dictionary)
+        stored, encode_rate, decode_rate = bench_codec(payloads, json_bytes)
+        line = f"{codec:<11}{stored / 1024:>11.1f}{json_bytes / stored:>8.2f}{encode_rate:>10.1f}{decode_rate:>10.1f}"
+        if args.db:
+            writes, reads = bench_database(symbols, payloads)
+            line += f"{writes:>10.0f}{reads:>9.0f}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -24,8 +24,9 @@ You are a financial analysis expert. I will provide you with financial data from
 summarize the data into concise, structured answers for each stock. These summaries will be displayed on a non-interactive financial dashboard, so they must be 
 informative and digestible at a glance.
 
-The data includes current market data (quote) and recent price history (historical). If a required data field is missing, acknowledge it concisely and continue. 
-When helpful, you may incorporate other fields to support or explain the analysis.
+The data includes current market data (quote), technical indicators and price history as daily, weekly and monthly OHLCV bars (newest first, 
+chg% vs the previous bar; the newest weekly/monthly bar may be partial). If a required data field is missing, acknowledge it concisely and continue. 
+When helpful, you may incorporate other fields to support or explain the analysis.{data_format}
 
 For each question, provide the output exactly as:
 symbol: {symbol}
@@ -46,21 +47,220 @@ This output will be presented to end users without interaction. It must deliver
 excessive detail.
 
 Data:
-{json_data}
+{data}
 """
 
+# Legend added to the prompt for the compact data encoding
+COMPACT_DATA_LEGEND = """
+Data is given as "[section] key=value" lines and "[section] header" tables followed by CSV rows. Abbreviations: o/h/l/c=open/high/low/close, chg=change, vol=volume, 
+mcap=market cap, ma50/ma200=50/200-day average price, lo/hi=low/high, yr=52-week, ret=return, volat=annualized volatility, 
+atr=average true range, max_dd=max drawdown, beta is vs the market index; K/M/B/T=thousand/million/billion/trillion."""
+
+# Prompt data encoding: 'compact' (key=value lines and CSV tables) or 'json' (previous format)
+PROMPT_CONFIG = {
+    'encoding': os.getenv('PROMPT_ENCODING', 'compact'),
+    'significant_digits': 4
+}
+
 # FMP API configuration
 FMP_CONFIG = {
     'base_url': 'https://financialmodelingprep.com/api/v3',
     'api_key': os.getenv('FMP_API_KEY'),
     'timeout': 30,
-    'max_retries': 3
+    'max_retries': 3,
+    # Bytes read per chunk when streaming large historical responses
+    'stream_chunk_size': 65536
 }
 
-# Data limits to stay within Groq token limits (llama3-8b-8192 max: 8192 tokens)
-# Approximately 4 chars per token, so ~32KB max input
+# historical_days of daily bars are fetched and stored; prompts only see the fixed-size timeframe
+# summaries, and max_json_size caps a prompt's data section (characters) as a safety net
 DATA_LIMITS = {
-    'historical_days': 10,
-    'max_json_size': 25000,
-    'truncate_threshold': 20000
+    'historical_days': 400,
+    'max_json_size': 25000
+}
+
+
+# Symbol universe: 'config' uses STOCK_SYMBOLS, 'database' streams the stocks table,
+# 'file' streams one ticker per line (optionally CSV, first column) from file_path
+UNIVERSE_CONFIG = {
+    'source': os.getenv('UNIVERSE_SOURCE', 'config'),
+    'file_path': os.getenv('UNIVERSE_FILE', 'symbols.txt'),
+    'batch_size': 1000
+}
+
+# Streaming pipeline: bounded queues between fetch, analyze and store stages
+PIPELINE_CONFIG = {
+    'queue_size': 4,
+    'symbol_delay': 5,
+    'max_failures_reported': 50
+}
+
+# Startup health checks run concurrently; probes still pending at the deadline count as failed
+STARTUP_CONFIG = {
+    'deadline': 3,
+    'probe_timeout': 2
+}
+
+# Company profile sync: profiles change rarely, so they are cached on disk for long periods
+METADATA_CONFIG = {
+    'batch_size': 50,
+    'cache_path': os.getenv('METADATA_CACHE', '.cache/stock_profiles.json'),
+    'cache_ttl_days': 30,
+    'missing_ttl_days': 1
+}
+
+# Dashboard read model: materialized view refreshed after each run, served over local HTTP
+DASHBOARD_CONFIG = {
+    'view_name': 'dashboard_answers',
+    'host': os.getenv('DASHBOARD_HOST', '127.0.0.1'),
+    'port': int(os.getenv('DASHBOARD_PORT', '8050'))
+}
+
+# Technical indicators computed across the universe; beta is measured against benchmark_symbol
+INDICATOR_CONFIG = {
+    'benchmark_symbol': os.getenv('BENCHMARK_SYMBOL', 'SPY'),
+    'batch_size': 50,
+    'ma_short': 20,
+    'ma_long': 50,
+    'rsi_window': 14,
+    'atr_window': 14,
+    'beta_min_periods': 20
+}
+
+# Per-provider circuit breakers and the total run deadline that caps every call's timeout
+RESILIENCE_CONFIG = {
+    'run_deadline': int(os.getenv('RUN_DEADLINE', '1500')),
+    'failure_threshold': 3,
+    'reset_timeout': 60,
+    'min_call_timeout': 1,
+    'groq_timeout': 60
+}
+
+# Daily API quotas tracked in the api_usage table; the planner fits each run into what is left
+QUOTA_CONFIG = {
+    'fmp_daily_calls': int(os.getenv('FMP_DAILY_CALLS', '250')),
+    'groq_daily_calls': int(os.getenv('GROQ_DAILY_CALLS', '14400')),
+    'groq_daily_tokens': int(os.getenv('GROQ_DAILY_TOKENS', '500000')),
+    # About 1,750 prompt tokens (benchmarks/prompt_encoding.py) plus both tiers' max_tokens
+    'groq_tokens_per_symbol': 3000,
+    'reserve_calls': 5,
+    # FMP calls held back for refetching symbols whose fetch failed transiently and is retried
+    'retry_fetch_calls': 10,
+    'flush_every': 10
+}
+
+# Higher priority symbols are planned first; unlisted symbols default to 0
+SYMBOL_PRIORITIES = {
+    "AAPL": 1, "MSFT": 1, "AMZN": 1, "NVO": 1
+}
+
+# Per-question model routing: each question template maps to a tier by keyword, and tiers run in parallel
+MODEL_TIERS = {
+    'fast': {'model': 'llama3-8b-8192', 'max_tokens': 400},
+    'large': {'model': 'llama3-70b-8192', 'max_tokens': 600}
+}
+
+MODEL_ROUTING = {
+    'default_tier': 'fast',
+    'keyword_tiers': {
+        'valuat': 'large',
+        'overvalued': 'large',
+        'undervalued': 'large',
+        'financial statements': 'large'
+    },
+    'max_parallel': 4,
+    'group_retries': 1,
+    # Prompt data sections a question needs, by keyword; a group's prompt carries the union of its
+    # questions' sections, and a question matching no keyword gets every section
+    'keyword_sections': {
+        'historical trend': ['current_market', 'indicators', 'daily', 'weekly', 'monthly', 'price_history', 'computed_metrics'],
+        'volatility': ['current_market', 'indicators', 'weekly', 'monthly', 'price_history'],
+        'valuat': ['current_market', 'indicators', 'computed_metrics'],
+        'overvalued': ['current_market', 'indicators', 'computed_metrics'],
+        'undervalued': ['current_market', 'indicators', 'computed_metrics'],
+        'financial statements': ['current_market', 'computed_metrics'],
+        'insider': ['current_market', 'computed_metrics']
+    }
+}
+
+# Bulk exports of answers, stocks and raw_data snapshots for the dashboard and offline analysis
+EXPORT_CONFIG = {
+    'directory': os.getenv('EXPORT_DIR', 'exports'),
+    'format': 'csv',
+    'batch_size': 5000
+}
+
+# --profile output: the workflow uploads logs/ when a run fails
+PROFILE_CONFIG = {
+    'output_dir': 'logs',
+    'top_allocations': 25,
+    'traceback_frames': 10
+}
+
+# Storage backend: 'postgres' (DB_CONFIG) or 'sqlite' for single-node runs, CI and local benchmarks
+STORAGE_CONFIG = {
+    'backend': os.getenv('STORAGE_BACKEND', 'postgres'),
+    'sqlite_path': os.getenv('SQLITE_PATH', 'stock_analysis.db'),
+    'sqlite_busy_timeout': 30
+}
+
+# Daemon mode (--daemon): refresh each symbol refresh_delay_minutes after its exchange session closes
+SCHEDULER_CONFIG = {
+    'refresh_delay_minutes': 30,
+    'retry_minutes': 60,
+    'poll_interval': 60,
+    # Symbols added to or removed from the universe are picked up this often
+    'universe_reload_minutes': 15,
+    'max_batch': 25,
+    'pool_size': 6,
+    'default_session': 'NYSE'
+}
+
+# Exchange (FMP exchangeShortName) -> (timezone, local session close); sessions run Monday to Friday
+EXCHANGE_SESSIONS = {
+    'NYSE': ('America/New_York', '16:00'),
+    'NASDAQ': ('America/New_York', '16:00'),
+    'AMEX': ('America/New_York', '16:00'),
+    'TSX': ('America/Toronto', '16:00'),
+    'LSE': ('Europe/London', '16:30'),
+    'XETRA': ('Europe/Berlin', '17:30'),
+    'EURONEXT': ('Europe/Paris', '17:30'),
+    'AMS': ('Europe/Amsterdam', '17:30'),
+    'SIX': ('Europe/Zurich', '17:30'),
+    'JPX': ('Asia/Tokyo', '15:30'),
+    'HKSE': ('Asia/Hong_Kong', '16:00'),
+    'SHH': ('Asia/Shanghai', '15:00'),
+    'SHZ': ('Asia/Shanghai', '15:00'),
+    'NSE': ('Asia/Kolkata', '15:30'),
+    'ASX': ('Australia/Sydney', '16:00')
+}
+
+# Fallback when a stock's exchange is unknown: its country's main exchange
+COUNTRY_SESSIONS = {
+    'US': 'NYSE', 'CA': 'TSX', 'GB': 'LSE', 'DE': 'XETRA', 'FR': 'EURONEXT',
+    'NL': 'AMS', 'CH': 'SIX', 'JP': 'JPX', 'HK': 'HKSE', 'CN': 'SHH',
+    'IN': 'NSE', 'AU': 'ASX'
+}
+
+# raw_data payload codec: 'zstd' (zlib when zstandard is not installed), 'zlib' or 'json' (uncompressed text)
+RAW_DATA_CONFIG = {
+    'codec': os.getenv('RAW_DATA_CODEC', 'zstd'),
+    'level': 3,
+    'use_dictionary': True,
+    'dictionary_size': 16384,
+    'dictionary_samples': 500
+}
+
+# Multi-timeframe price summary sent to the LLM instead of raw daily bars: newest N bars per timeframe
+TIMEFRAME_CONFIG = {
+    'bars': {'daily': 10, 'weekly': 12, 'monthly': 12},
+    'decimals': 4
+}
+
+# In-run retries: transiently failed symbols are retried after the main pass with exponential backoff
+RETRY_CONFIG = {
+    'max_attempts': 3,
+    'backoff_base': 5,
+    'backoff_factor': 2,
+    'max_queued': 100
 }
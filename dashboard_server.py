@@ -0,0 +1,51 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+
+from config import DASHBOARD_CONFIG
+from database.dashboard_handler import get_dashboard_data
+
+load_dotenv()
+
+class DashboardRequestHandler(BaseHTTPRequestHandler):
+    """Serve the dashboard matrix as JSON with ETag revalidation"""
+    
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/answers'):
+            self.send_error(404)
+            return
+        
+        payload, etag = get_dashboard_data()
+        if payload is None:
+            self.send_error(503, "Dashboard data unavailable")
+            return
+        
+        if etag and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve():
+    """Run the local dashboard endpoint until interrupted"""
+    address = (DASHBOARD_CONFIG['host'], DASHBOARD_CONFIG['port'])
+    server = ThreadingHTTPServer(address, DashboardRequestHandler)
+    print(f"Serving dashboard answers on http://{address[0]}:{address[1]}/answers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    serve()
@@ -1,15 +1,64 @@
-import requests
 import time
-import json
+from datetime import date
 from config import FMP_CONFIG, DATA_LIMITS
+from data_extraction.history import history_columns, parse_historical_stream
+from pipeline.quota import has_call_budget, record_usage
+from pipeline.resilience import ProviderError, get_breaker, get_run_deadline, is_provider_failure, is_transient_status
 
-def fetch_fmp_quote(symbol):
-    """Fetch current market data from FMP Quote endpoint"""
+_session = None
+_benchmark_cache = {}
+
+def get_session():
+    """Return a shared HTTP session, importing requests on first use"""
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+    return _session
+
+def request_fmp(url, params, timeout=None, stream=False):
+    """GET an FMP endpoint through the provider circuit breaker, with the timeout capped by the run deadline.
+
+    Calls are skipped once today's FMP quota is spent and every sent call is
+    recorded in the quota ledger. Returns the successful response (with the body
+    left unread when stream is set); raises ProviderError when the call was
+    skipped, failed outright or got an error status.
+    """
+    breaker = get_breaker('fmp')
+    deadline = get_run_deadline()
+    if deadline.expired():
+        raise ProviderError('fmp', "run deadline reached", transient=False)
+    if not has_call_budget('fmp'):
+        raise ProviderError('fmp', "daily quota spent", transient=False)
+    if not breaker.allow_request():
+        raise ProviderError('fmp', "circuit open", sent=False)
+    
+    record_usage('fmp')
+    try:
+        response = get_session().get(url, params=params, timeout=deadline.timeout(timeout or FMP_CONFIG['timeout']),
+                                     stream=stream)
+    except Exception as e:
+        breaker.record_failure()
+        raise ProviderError('fmp', f"request failed: {e}") from e
+    
+    if is_provider_failure(response.status_code):
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    
+    if response.status_code >= 400:
+        response.close()
+        raise ProviderError('fmp', f"HTTP {response.status_code}", response.status_code,
+                            is_transient_status(response.status_code))
+    return response
+
+def fetch_fmp_quote(symbol, timeout=None):
+    """Fetch current market data from FMP Quote endpoint; provider failures raise ProviderError"""
     try:
         url = f"{FMP_CONFIG['base_url']}/quote/{symbol}"
         params = {'apikey': FMP_CONFIG['api_key']}
         
-        response = requests.get(url, params=params, timeout=FMP_CONFIG['timeout'])
+        response = request_fmp(url, params, timeout)
         
         if response.status_code == 200:
             data = response.json()
@@ -38,97 +87,130 @@ def fetch_fmp_quote(symbol):
                     'sharesOutstanding': quote.get('sharesOutstanding')
                 }
         return None
+    except ProviderError:
+        raise
     except Exception:
         return None
 
-def fetch_fmp_historical(symbol):
-    """Fetch historical price data from FMP Historical endpoint"""
+def fetch_fmp_historical(symbol, days=None):
+    """Fetch historical price data from FMP Historical endpoint as history columns; provider failures raise ProviderError"""
     try:
         url = f"{FMP_CONFIG['base_url']}/historical-price-full/{symbol}"
         params = {
             'apikey': FMP_CONFIG['api_key'],
-            'timeseries': DATA_LIMITS['historical_days']
+            'timeseries': days or DATA_LIMITS['historical_days']
         }
         
-        response = requests.get(url, params=params, timeout=FMP_CONFIG['timeout'])
+        response = request_fmp(url, params, stream=True)
         
         if response.status_code == 200:
-            data = response.json()
-            if data and 'historical' in data:
-                historical = data['historical']
-                
-                essential_historical = []
-                for record in historical:
-                    essential_historical.append({
-                        'date': record.get('date'),
-                        'open': record.get('open'),
-                        'high': record.get('high'),
-                        'low': record.get('low'),
-                        'close': record.get('close'),
-                        'volume': record.get('volume'),
-                        'change': record.get('change'),
-                        'changePercent': record.get('changePercent')
-                    })
-                
-                return {
-                    'symbol': data.get('symbol'),
-                    'historical': essential_historical
-                }
+            # Parse the body as it downloads, projecting each record straight into columns
+            try:
+                columns = parse_historical_stream(response.iter_content(chunk_size=FMP_CONFIG['stream_chunk_size']))
+            finally:
+                response.close()
+            if len(columns):
+                return columns.to_payload(symbol)
         return None
+    except ProviderError:
+        raise
     except Exception:
         return None
 
-def fetch_fmp_stock_data(symbol):
-    """Fetch both quote and historical data for a stock"""
+def fetch_benchmark_history(symbol):
+    """Fetch a benchmark index's history columns once per day and reuse them"""
+    key = (symbol, date.today().isoformat())
+    if key not in _benchmark_cache:
+        try:
+            data = fetch_fmp_historical(symbol)
+        except ProviderError as e:
+            if e.transient:
+                return None
+            data = None
+        _benchmark_cache.clear()
+        _benchmark_cache[key] = history_columns(data)
+    return _benchmark_cache[key]
+
+def benchmark_history_cached(symbol):
+    """Whether today's benchmark history is already held, so using it costs no FMP call"""
+    return (symbol, date.today().isoformat()) in _benchmark_cache
+
+def fetch_fmp_profiles(symbols):
+    """Fetch company profiles for several symbols in one FMP Profile request"""
     try:
-        quote_data = fetch_fmp_quote(symbol)
-        time.sleep(1)
-        historical_data = fetch_fmp_historical(symbol)
+        if not symbols:
+            return {}
         
-        if quote_data or historical_data:
-            stock_data = {
-                'symbol': symbol,
-                'quote': quote_data,
-                'historical': historical_data
-            }
-            
-            data_json = json.dumps(stock_data)
-            if len(data_json) > DATA_LIMITS['max_json_size']:
-                stock_data = truncate_stock_data(stock_data)
-            
-            return stock_data
+        url = f"{FMP_CONFIG['base_url']}/profile/{','.join(symbols)}"
+        params = {'apikey': FMP_CONFIG['api_key']}
+        
+        response = request_fmp(url, params)
+        
+        if response.status_code == 200:
+            profiles = {}
+            for profile in response.json() or []:
+                profiles[profile.get('symbol')] = {
+                    'symbol': profile.get('symbol'),
+                    'companyName': profile.get('companyName'),
+                    'exchangeShortName': profile.get('exchangeShortName'),
+                    'country': profile.get('country'),
+                    'sector': profile.get('sector'),
+                    'industry': profile.get('industry'),
+                    'currency': profile.get('currency'),
+                    'ipoDate': profile.get('ipoDate'),
+                    'isin': profile.get('isin')
+                }
+            return profiles
         return None
     except Exception:
         return None
 
-def truncate_stock_data(stock_data):
-    """Truncate data to fit within token limits"""
+def fetch_fmp_stock_data(symbol, quote_data=None, history_days=None):
+    """Fetch both quote and historical data for a stock, reusing a prefetched quote if given.
+
+    history_days=0 skips the historical call (quote only). Either part may fail on
+    its own; ProviderError is raised only when neither produced data.
+    """
+    error = None
     try:
-        if stock_data.get('historical') and stock_data['historical'].get('historical'):
-            historical_records = stock_data['historical']['historical'][:5]
-            stock_data['historical']['historical'] = historical_records
+        if quote_data is None:
+            try:
+                quote_data = fetch_fmp_quote(symbol)
+            except ProviderError as e:
+                error = e
+            if quote_data and history_days != 0:
+                time.sleep(1)
+        
+        historical_data = None
+        if history_days != 0:
+            try:
+                historical_data = fetch_fmp_historical(symbol, history_days)
+            except ProviderError as e:
+                error = error if error is not None and error.transient else e
         
-        data_json = json.dumps(stock_data)
-        if len(data_json) > DATA_LIMITS['truncate_threshold']:
+        if not (quote_data or historical_data) and error is not None:
+            raise error
+        
+        if quote_data or historical_data:
+            # Full history is kept: prompts use fixed-size timeframe summaries, not raw bars
             return {
-                'symbol': stock_data['symbol'],
-                'quote': stock_data.get('quote'),
-                'historical': {
-                    'symbol': stock_data['symbol'],
-                    'historical': stock_data.get('historical', {}).get('historical', [])[:3]
-                }
+                'symbol': symbol,
+                'quote': quote_data,
+                'historical': historical_data
             }
-        return stock_data
+        return None
+    except ProviderError:
+        raise
     except Exception:
-        return stock_data
+        return None
 
-def test_fmp_connection():
+def test_fmp_connection(symbol="AAPL", timeout=None):
     """Test FMP API connection"""
     try:
         if not FMP_CONFIG['api_key']:
             return False
         
-        quote_data = fetch_fmp_quote("AAPL")
+        quote_data = fetch_fmp_quote(symbol, timeout)
         return bool(quote_data)
     except Exception:
         return False
@@ -138,7 +220,10 @@ def fetch_multiple_stocks(symbols, delay_between=2):
     results = []
     
     for i, symbol in enumerate(symbols):
-        data = fetch_fmp_stock_data(symbol)
+        try:
+            data = fetch_fmp_stock_data(symbol)
+        except ProviderError:
+            data = None
         if data:
             results.append(data)
         
@@ -0,0 +1,139 @@
+import codecs
+import json
+import math
+import re
+from array import array
+
+# Numeric fields kept from FMP historical records; dates are kept as ISO strings
+HISTORY_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'change', 'changePercent')
+
+ARRAY_START = re.compile(r'"historical"\s*:\s*\[')
+SEPARATORS = ' \t\r\n,'
+
+class HistoryColumns:
+    """Columnar price history: a list of dates plus one array('d') per numeric field, NaN when missing"""
+    
+    def __init__(self):
+        self.dates = []
+        self.values = {field: array('d') for field in HISTORY_FIELDS}
+    
+    def __len__(self):
+        return len(self.dates)
+    
+    def append(self, record):
+        """Project one FMP record onto the columns"""
+        self.dates.append(record.get('date'))
+        for field, column in self.values.items():
+            value = record.get(field)
+            column.append(float(value) if isinstance(value, (int, float)) else math.nan)
+    
+    def to_payload(self, symbol):
+        return {'symbol': symbol, 'columns': {'date': self.dates, **self.values}}
+
+class HistoricalStreamParser:
+    """Incrementally decode the records of the "historical" array from text chunks.
+    
+    Only the unparsed tail (at most one partial record plus a chunk) is
+    buffered, so memory stays proportional to the chunk size rather than the
+    length of the history.
+    """
+    
+    def __init__(self, max_record_size=65536):
+        self.buffer = ''
+        self.in_array = False
+        self.done = False
+        self.decoder = json.JSONDecoder()
+        self.max_record_size = max_record_size
+    
+    def feed(self, text):
+        """Consume a text chunk and yield every record completed by it"""
+        if self.done:
+            return
+        self.buffer += text
+        
+        if not self.in_array:
+            match = ARRAY_START.search(self.buffer)
+            if not match:
+                # Keep enough tail for a key split across chunks
+                self.buffer = self.buffer[-64:]
+                return
+            self.buffer = self.buffer[match.end():]
+            self.in_array = True
+        
+        position = 0
+        length = len(self.buffer)
+        while True:
+            while position < length and self.buffer[position] in SEPARATORS:
+                position += 1
+            if position >= length:
+                break
+            if self.buffer[position] == ']':
+                self.done = True
+                break
+            
+            try:
+                record, end = self.decoder.raw_decode(self.buffer, position)
+            except ValueError:
+                # A record split across chunks: wait for more text unless it cannot be one record
+                if length - position > self.max_record_size:
+                    raise
+                break
+            position = end
+            if isinstance(record, dict):
+                yield record
+        
+        self.buffer = self.buffer[position:]
+
+def parse_historical_stream(chunks, encoding='utf-8'):
+    """Parse an FMP historical-price-full body from byte chunks into HistoryColumns"""
+    decoder = codecs.getincrementaldecoder(encoding)()
+    parser = HistoricalStreamParser()
+    columns = HistoryColumns()
+    
+    for chunk in chunks:
+        for record in parser.feed(decoder.decode(chunk)):
+            columns.append(record)
+        if parser.done:
+            break
+    else:
+        for record in parser.feed(decoder.decode(b'', final=True)):
+            columns.append(record)
+    return columns
+
+def history_columns(historical):
+    """Return {'date': [...], field: [...]} from a columnar or legacy list-of-records payload, or None"""
+    if not historical:
+        return None
+    
+    columns = historical.get('columns')
+    if columns is not None:
+        return columns if columns.get('date') else None
+    
+    records = historical.get('historical') or []
+    if not records:
+        return None
+    
+    legacy = HistoryColumns()
+    for record in records:
+        legacy.append(record)
+    return legacy.to_payload(historical.get('symbol'))['columns']
+
+def history_records(historical, limit=None):
+    """Return the newest `limit` bars (all by default) as record dicts from either payload format"""
+    if not historical:
+        return []
+    
+    if historical.get('columns') is None:
+        return (historical.get('historical') or [])[:limit]
+    
+    columns = historical['columns']
+    dates = columns.get('date') or []
+    count = len(dates) if limit is None else min(limit, len(dates))
+    return [
+        {'date': dates[i], **{field: clean_value(columns[field][i]) for field in HISTORY_FIELDS if field in columns}}
+        for i in range(count)
+    ]
+
+def clean_value(value):
+    """NaN placeholders back to None, for JSON and for prompts"""
+    return None if value is None or (isinstance(value, float) and math.isnan(value)) else value
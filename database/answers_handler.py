@@ -1,3 +1,4 @@
+from datetime import datetime
 from database.db_connection import DatabaseConnection
 
 def insert_or_update_answer(symbol, question_id, answer_text):
@@ -60,4 +61,20 @@ def verify_answer_stored(symbol, question_id):
             results = db.fetch_all(query, (symbol, question_id))
             return bool(results)
     except Exception:
-        return False
\ No newline at end of file
+        return False
+
+def get_last_answer_times():
+    """Return {symbol: latest answer timestamp} for every symbol with answers"""
+    try:
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return {}
+            
+            query = "SELECT symbol, MAX(created_at) AS last_answered FROM answers GROUP BY symbol"
+            results = db.fetch_all(query)
+            # SQLite returns CURRENT_TIMESTAMP values as text
+            return {row['symbol']: datetime.fromisoformat(row['last_answered'])
+                    if isinstance(row['last_answered'], str) else row['last_answered']
+                    for row in results}
+    except Exception:
+        return {}
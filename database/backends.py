@@ -0,0 +1,213 @@
+import itertools
+import os
+import threading
+from config import DB_CONFIG, STORAGE_CONFIG
+
+_cursor_ids = itertools.count(1)
+
+class PostgresBackend:
+    """Remote PostgreSQL through psycopg2; every execute_query commits on its own"""
+    name = 'postgres'
+    commit_each_query = True
+    
+    def __init__(self):
+        self.pool = None
+        self.pool_slots = None
+    
+    def enable_pool(self, size):
+        """Keep up to size connections open for long-running processes instead of reconnecting per call"""
+        from psycopg2.pool import ThreadedConnectionPool
+        
+        if self.pool is None:
+            self.pool = ThreadedConnectionPool(1, size, **DB_CONFIG)
+            # getconn raises instead of waiting when the pool is exhausted, so callers queue here
+            self.pool_slots = threading.BoundedSemaphore(size)
+    
+    def connect(self, connect_timeout=None):
+        import psycopg2
+        from psycopg2.extras import RealDictCursor
+        
+        if self.pool is not None:
+            self.pool_slots.acquire()
+            try:
+                connection = self.pool.getconn()
+                # Connections the server dropped while idle in the pool are discarded for fresh ones
+                while connection.closed:
+                    self.pool.putconn(connection, close=True)
+                    connection = self.pool.getconn()
+            except Exception:
+                self.pool_slots.release()
+                raise
+        else:
+            options = {'connect_timeout': connect_timeout} if connect_timeout else {}
+            connection = psycopg2.connect(**DB_CONFIG, **options)
+        connection.autocommit = False
+        return connection, connection.cursor(cursor_factory=RealDictCursor)
+    
+    def release(self, connection):
+        """Return a pooled connection (dropping it if it broke) or close an unpooled one"""
+        if self.pool is None:
+            connection.close()
+            return
+        try:
+            self.pool.putconn(connection, close=bool(connection.closed))
+        finally:
+            self.pool_slots.release()
+    
+    def prepare(self, query):
+        return query
+    
+    def iter_rows(self, connection, query, params, batch_size):
+        """Stream rows through a named server-side cursor, batch_size rows per round trip"""
+        from psycopg2.extras import RealDictCursor
+        
+        cursor = connection.cursor(name=f"stream_{next(_cursor_ids)}", cursor_factory=RealDictCursor)
+        cursor.itersize = batch_size
+        try:
+            cursor.execute(query, params)
+            yield from cursor
+        finally:
+            cursor.close()
+    
+    def describe(self, connection, query):
+        """(name, type name) for each column the query returns, from the description of a LIMIT 0 run"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT * FROM ({query}) AS described LIMIT 0")
+            columns = [(column.name, column.type_code) for column in cursor.description]
+            cursor.execute("SELECT oid, typname FROM pg_type WHERE oid = ANY(%s)", ([code for _, code in columns],))
+            type_names = dict(cursor.fetchall())
+        return [(name, type_names.get(code)) for name, code in columns]
+    
+    def execute_values(self, cursor, query, rows):
+        """Run an INSERT ... VALUES %s for all rows as a single statement"""
+        from psycopg2.extras import execute_values
+        execute_values(cursor, query, rows, page_size=max(1, len(rows)))
+
+def dict_row_factory(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+SQLITE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS stocks (
+        symbol TEXT PRIMARY KEY,
+        name TEXT,
+        country TEXT,
+        sector TEXT,
+        region TEXT,
+        industry TEXT,
+        exchange TEXT,
+        currency TEXT,
+        ipo_year INTEGER,
+        isin TEXT
+    );
+    CREATE TABLE IF NOT EXISTS questions_templates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        question_text TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE IF NOT EXISTS raw_data (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT NOT NULL REFERENCES stocks (symbol),
+        raw_data TEXT CHECK (raw_data IS NULL OR json_valid(raw_data)),
+        payload BLOB,
+        codec TEXT,
+        summary TEXT CHECK (summary IS NULL OR json_valid(summary)),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX IF NOT EXISTS raw_data_symbol_created ON raw_data (symbol, created_at);
+    CREATE TABLE IF NOT EXISTS answers (
+        symbol TEXT NOT NULL REFERENCES stocks (symbol),
+        question_id INTEGER NOT NULL REFERENCES questions_templates (id),
+        answer_text TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (symbol, question_id)
+    );
+"""
+
+class SQLiteBackend:
+    """Embedded SQLite in WAL mode; statements in one `with DatabaseConnection()` block share a transaction"""
+    name = 'sqlite'
+    commit_each_query = False
+    
+    def __init__(self):
+        self.schema_ready = False
+        self.schema_lock = threading.Lock()
+    
+    def connect(self, connect_timeout=None):
+        import sqlite3
+        
+        path = STORAGE_CONFIG['sqlite_path']
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        connection = sqlite3.connect(path, timeout=connect_timeout or STORAGE_CONFIG['sqlite_busy_timeout'])
+        connection.row_factory = dict_row_factory
+        connection.execute("PRAGMA synchronous = NORMAL")
+        connection.execute("PRAGMA foreign_keys = ON")
+        self.ensure_schema(connection)
+        return connection, connection.cursor()
+    
+    def ensure_schema(self, connection):
+        """Switch the file to WAL and create the tables once per process"""
+        with self.schema_lock:
+            if not self.schema_ready:
+                connection.execute("PRAGMA journal_mode = WAL")
+                connection.executescript(SQLITE_SCHEMA)
+                self.schema_ready = True
+    
+    def enable_pool(self, size):
+        """Connections to a local file are cheap; SQLite opens one per block regardless"""
+    
+    def release(self, connection):
+        connection.close()
+    
+    def prepare(self, query):
+        return query.replace('%s', '?')
+    
+    def iter_rows(self, connection, query, params, batch_size):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(self.prepare(query), params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            cursor.close()
+    
+    def describe(self, connection, query):
+        """(name, declared type) for each column the query returns.
+
+        SQLite cursor descriptions carry no types, so the query is read back
+        through a temporary view, which keeps the declared types of its columns.
+        """
+        view = f"described_{next(_cursor_ids)}"
+        connection.execute(f"CREATE TEMP VIEW {view} AS {self.prepare(query)}")
+        try:
+            return [(row['name'], row['type'].lower() or None) for row in connection.execute(f"PRAGMA table_info({view})")]
+        finally:
+            connection.execute(f"DROP VIEW {view}")
+    
+    def execute_values(self, cursor, query, rows):
+        """Expand VALUES %s to one placeholder group and run it for every row in the open transaction"""
+        if not rows:
+            return
+        group = '(' + ', '.join('?' for _ in rows[0]) + ')'
+        cursor.executemany(query.replace('VALUES %s', f'VALUES {group}'), rows)
+
+BACKENDS = {
+    'postgres': PostgresBackend,
+    'sqlite': SQLiteBackend
+}
+
+_backend = None
+
+def get_backend():
+    """Return the process-wide storage backend selected by STORAGE_CONFIG['backend']"""
+    global _backend
+    if _backend is None:
+        backend_class = BACKENDS.get(STORAGE_CONFIG['backend'])
+        if backend_class is None:
+            raise ValueError(f"Unknown storage backend: {STORAGE_CONFIG['backend']}")
+        _backend = backend_class()
+    return _backend
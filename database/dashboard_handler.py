@@ -0,0 +1,125 @@
+import hashlib
+import threading
+from config import DASHBOARD_CONFIG
+from database.db_connection import DatabaseConnection
+from database.raw_data_handler import convert_data
+
+VIEW_NAME = DASHBOARD_CONFIG['view_name']
+
+VIEW_QUERY = """
+    SELECT a.symbol, s.name, s.exchange, s.country, s.sector, s.industry,
+           a.question_id, q.question_text, a.answer_text, a.created_at
+    FROM answers a
+    JOIN questions_templates q ON q.id = a.question_id
+    LEFT JOIN stocks s ON s.symbol = a.symbol
+"""
+
+_cache = {'version': None, 'payload': None, 'etag': None}
+_cache_lock = threading.Lock()
+
+def ensure_dashboard_view():
+    """Create the dashboard materialized view and its unique index if they do not exist"""
+    try:
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return False
+            
+            # SQLite has no materialized views, so the read model there is a plain table
+            kind = 'MATERIALIZED VIEW' if db.dialect == 'postgres' else 'TABLE'
+            create_query = f"CREATE {kind} IF NOT EXISTS {VIEW_NAME} AS {VIEW_QUERY}"
+            index_query = f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS {VIEW_NAME}_symbol_question
+                ON {VIEW_NAME} (symbol, question_id)
+            """
+            return db.execute_query(create_query) and db.execute_query(index_query)
+    except Exception:
+        return False
+
+def refresh_dashboard_view():
+    """Refresh the dashboard view at the end of a run without blocking concurrent readers"""
+    try:
+        if not ensure_dashboard_view():
+            return False
+        
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return False
+            
+            if db.dialect == 'postgres':
+                return db.execute_query(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {VIEW_NAME}")
+            
+            # One transaction: WAL readers keep seeing the previous snapshot until it commits
+            return (db.execute_query(f"DELETE FROM {VIEW_NAME}")
+                    and db.execute_query(f"INSERT INTO {VIEW_NAME} {VIEW_QUERY}"))
+    except Exception:
+        return False
+
+def get_dashboard_version():
+    """Return the run version of the view: latest answer timestamp plus row count"""
+    try:
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return None
+            
+            query = f"SELECT MAX(created_at) AS latest, COUNT(*) AS count FROM {VIEW_NAME}"
+            results = db.fetch_all(query)
+            if not results:
+                return None
+            return f"{convert_data(results[0]['latest'])}:{results[0]['count']}"
+    except Exception:
+        return None
+
+def load_dashboard_matrix():
+    """Load the full symbol x question matrix from the view in one query"""
+    try:
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return None
+            
+            query = f"SELECT * FROM {VIEW_NAME} ORDER BY symbol, question_id"
+            rows = db.fetch_all(query)
+            
+            questions = {}
+            stocks = {}
+            for row in rows:
+                row = convert_data(dict(row))
+                questions[row['question_id']] = row['question_text']
+                stock = stocks.setdefault(row['symbol'], {
+                    'symbol': row['symbol'],
+                    'name': row['name'],
+                    'exchange': row['exchange'],
+                    'country': row['country'],
+                    'sector': row['sector'],
+                    'industry': row['industry'],
+                    'answers': {}
+                })
+                stock['answers'][str(row['question_id'])] = {
+                    'answer_text': row['answer_text'],
+                    'created_at': row['created_at']
+                }
+            
+            return {
+                'questions': [{'id': qid, 'question_text': text} for qid, text in sorted(questions.items())],
+                'stocks': list(stocks.values())
+            }
+    except Exception:
+        return None
+
+def get_dashboard_data():
+    """Return (payload, etag) for the full dashboard, cached in-process per run version"""
+    version = get_dashboard_version()
+    
+    with _cache_lock:
+        if version is not None and version == _cache['version']:
+            return _cache['payload'], _cache['etag']
+    
+    payload = load_dashboard_matrix()
+    if payload is None:
+        return None, None
+    
+    payload['version'] = version
+    etag = '"' + hashlib.sha1(str(version).encode('utf-8')).hexdigest() + '"'
+    
+    with _cache_lock:
+        _cache.update(version=version, payload=payload, etag=etag)
+    return payload, etag
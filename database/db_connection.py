@@ -1,17 +1,16 @@
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from config import DB_CONFIG
+from database.backends import get_backend
 
 class DatabaseConnection:
-    def __init__(self):
+    def __init__(self, connect_timeout=None):
         self.connection = None
         self.cursor = None
+        self.connect_timeout = connect_timeout
+        self.backend = get_backend()
+        self.dialect = self.backend.name
     
     def connect(self):
         try:
-            self.connection = psycopg2.connect(**DB_CONFIG)
-            self.connection.autocommit = False
-            self.cursor = self.connection.cursor(cursor_factory=RealDictCursor)
+            self.connection, self.cursor = self.backend.connect(self.connect_timeout)
             return True
         except Exception as e:
             print(f"Database connection failed: {e}")
@@ -21,22 +20,65 @@ class DatabaseConnection:
         try:
             if self.cursor:
                 self.cursor.close()
+        except Exception:
+            pass
+        try:
             if self.connection:
-                self.connection.close()
+                self.backend.release(self.connection)
         except Exception:
             pass
+        finally:
+            self.connection = None
+            self.cursor = None
+    
+    def commit_query(self):
+        """Commit now on backends that commit per query; others commit once when the block exits"""
+        if self.backend.commit_each_query:
+            self.connection.commit()
     
     def execute_query(self, query, params=None):
         try:
             if not self.connection or not self.cursor:
                 return False
             
-            self.cursor.execute(query, params)
-            self.connection.commit()
+            self.cursor.execute(self.backend.prepare(query), params or ())
+            self.commit_query()
             return True
         except Exception as e:
             print(f"Query execution failed: {e}")
-            if self.connection:
+            # SQLite already undid the failed statement; rolling back would drop the rest of the batch
+            if self.connection and self.backend.commit_each_query:
+                self.connection.rollback()
+            return False
+    
+    def execute_returning(self, query, params=None):
+        """Run an INSERT ... RETURNING and return its first row, or None on failure"""
+        try:
+            if not self.connection or not self.cursor:
+                return None
+            
+            self.cursor.execute(self.backend.prepare(query), params or ())
+            row = self.cursor.fetchone()
+            self.commit_query()
+            return row
+        except Exception as e:
+            print(f"Query execution failed: {e}")
+            if self.connection and self.backend.commit_each_query:
+                self.connection.rollback()
+            return None
+    
+    def execute_values(self, query, rows):
+        """Run an INSERT ... VALUES %s for every row in as few round trips as the backend allows"""
+        try:
+            if not self.connection or not self.cursor:
+                return False
+            
+            self.backend.execute_values(self.cursor, query, rows)
+            self.commit_query()
+            return True
+        except Exception as e:
+            print(f"Query execution failed: {e}")
+            if self.connection and self.backend.commit_each_query:
                 self.connection.rollback()
             return False
     
@@ -45,11 +87,27 @@ class DatabaseConnection:
             if not self.connection or not self.cursor:
                 return []
             
-            self.cursor.execute(query, params)
+            self.cursor.execute(self.backend.prepare(query), params or ())
             return self.cursor.fetchall()
         except Exception:
             return []
-    
+
+    def iter_rows(self, query, params=None, batch_size=1000):
+        """Stream rows batch_size at a time (a server-side cursor on PostgreSQL)"""
+        if not self.connection:
+            return
+        yield from self.backend.iter_rows(self.connection, query, params, batch_size)
+
+    def describe(self, query):
+        """(column name, type name or None) for each column the query returns, without fetching rows"""
+        try:
+            if not self.connection:
+                return []
+            return self.backend.describe(self.connection, query)
+        except Exception as e:
+            print(f"Describing query failed: {e}")
+            return []
+
     def __enter__(self):
         return self if self.connect() else None
     
@@ -64,14 +122,14 @@ class DatabaseConnection:
         finally:
             self.disconnect()
 
-def test_database_connection():
+def test_database_connection(connect_timeout=None):
     """Test database connection"""
     try:
-        with DatabaseConnection() as db:
+        with DatabaseConnection(connect_timeout) as db:
             if not db or not db.connection:
                 return False
             
             results = db.fetch_all("SELECT COUNT(*) as count FROM stocks")
             return bool(results)
     except Exception:
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,175 @@
+import csv
+import itertools
+import json
+import os
+from contextlib import closing
+from datetime import datetime
+from config import EXPORT_CONFIG
+from database.db_connection import DatabaseConnection
+from database.raw_data_handler import decode_row, ensure_payload_columns
+
+EXPORT_QUERIES = {
+    'answers': "SELECT symbol, question_id, answer_text, created_at FROM answers ORDER BY symbol, question_id",
+    'stocks': "SELECT * FROM stocks ORDER BY symbol",
+    'raw_data': "SELECT symbol, created_at, summary, raw_data, payload, codec FROM raw_data ORDER BY symbol, created_at"
+}
+
+def decode_raw_data_export(row):
+    """Replace the stored payload columns with the decoded JSON document"""
+    return {
+        'symbol': row['symbol'],
+        'created_at': row['created_at'],
+        'summary': to_arrow_value(row['summary']),
+        'raw_data': json.dumps(decode_row(row))
+    }
+
+# Tables whose rows need decoding in Python; they skip COPY
+EXPORT_ROW_TRANSFORMS = {
+    'raw_data': decode_raw_data_export
+}
+
+# Columns a transformed table's rows keep, when they differ from what its query selects
+EXPORT_OUTPUT_COLUMNS = {
+    'raw_data': ('symbol', 'created_at', 'summary', 'raw_data')
+}
+
+def export_path(directory, table, fmt):
+    return os.path.join(directory, f"{table}-{datetime.now().strftime('%Y%m%d')}.{fmt}")
+
+def export_columns(db, table):
+    """(name, type name) for each exported column, from the query's cursor description"""
+    columns = db.describe(EXPORT_QUERIES[table])
+    keep = EXPORT_OUTPUT_COLUMNS.get(table)
+    return [column for column in columns if keep is None or column[0] in keep]
+
+def export_table_csv(table, path, batch_size=None):
+    """Stream a table to CSV with COPY ... TO STDOUT, so rows never accumulate in Python.
+    
+    Backends without COPY, and tables that need decoding, write the rows with
+    the csv module as they are read.
+    """
+    try:
+        transform = EXPORT_ROW_TRANSFORMS.get(table, dict)
+        if table in EXPORT_ROW_TRANSFORMS:
+            ensure_payload_columns()
+        
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return False
+            
+            with open(path, 'w', encoding='utf-8', newline='') as handle:
+                if db.dialect == 'postgres' and table not in EXPORT_ROW_TRANSFORMS:
+                    db.cursor.copy_expert(f"COPY ({EXPORT_QUERIES[table]}) TO STDOUT WITH CSV HEADER", handle)
+                    return True
+                
+                columns = export_columns(db, table)
+                if not columns:
+                    return False
+                
+                # The header comes from the query, so an empty table still gets one
+                writer = csv.DictWriter(handle, fieldnames=[name for name, _ in columns])
+                writer.writeheader()
+                for row in db.iter_rows(EXPORT_QUERIES[table], batch_size=batch_size or EXPORT_CONFIG['batch_size']):
+                    writer.writerow(transform(row))
+            return True
+    except Exception as e:
+        print(f"CSV export of {table} failed: {e}")
+        return False
+
+def to_arrow_value(value):
+    """JSON columns become strings so every batch shares one flat Parquet schema"""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+def stringify(value):
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def parse_timestamp(value):
+    """SQLite returns timestamps as text"""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+def arrow_type(pa, type_name):
+    """Arrow type for a described column type; JSON, numeric and unknown types are exported as text"""
+    name = (type_name or '').lower()
+    if name in ('int2', 'int4', 'int8', 'smallint', 'integer', 'int', 'bigint'):
+        return pa.int64()
+    if name in ('float4', 'float8', 'real', 'double precision'):
+        return pa.float64()
+    if name in ('bool', 'boolean'):
+        return pa.bool_()
+    if name in ('timestamp', 'timestamptz', 'datetime'):
+        return pa.timestamp('us', tz='UTC' if name == 'timestamptz' else None)
+    return pa.string()
+
+def export_table_parquet(table, path, batch_size=None):
+    """Stream a table to Parquet in fixed-size record batches read from a streaming cursor.
+
+    The schema comes from the query's column types rather than the rows, so it
+    is the same on every run and an empty table still gets a file with it.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        print("Parquet export requires pyarrow (pip install pyarrow)")
+        return False
+    
+    batch_size = batch_size or EXPORT_CONFIG['batch_size']
+    transform = EXPORT_ROW_TRANSFORMS.get(table, dict)
+    if table in EXPORT_ROW_TRANSFORMS:
+        ensure_payload_columns()
+    
+    writer = None
+    try:
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return False
+            
+            columns = export_columns(db, table)
+            if not columns:
+                return False
+            schema = pa.schema([pa.field(name, arrow_type(pa, type_name)) for name, type_name in columns])
+            converters = {}
+            for field in schema:
+                if pa.types.is_string(field.type):
+                    converters[field.name] = stringify
+                elif pa.types.is_timestamp(field.type):
+                    converters[field.name] = parse_timestamp
+            writer = pq.ParquetWriter(path, schema)
+            
+            # Close the streaming cursor before the connection, also when a batch fails
+            with closing(db.iter_rows(EXPORT_QUERIES[table], batch_size=batch_size)) as rows:
+                while True:
+                    batch = []
+                    for row in itertools.islice(rows, batch_size):
+                        row = {key: to_arrow_value(value) for key, value in transform(row).items()}
+                        batch.append({key: converters[key](value) if key in converters else value
+                                      for key, value in row.items()})
+                    if not batch:
+                        break
+                    writer.write_batch(pa.RecordBatch.from_pylist(batch, schema=schema))
+        return True
+    except Exception as e:
+        print(f"Parquet export of {table} failed: {e}")
+        return False
+    finally:
+        if writer is not None:
+            writer.close()
+
+def export_tables(directory=None, fmt=None, tables=None):
+    """Export the given tables (all by default) and return {table: path or None on failure}"""
+    directory = directory or EXPORT_CONFIG['directory']
+    fmt = fmt or EXPORT_CONFIG['format']
+    os.makedirs(directory, exist_ok=True)
+    
+    results = {}
+    for table in tables or EXPORT_QUERIES:
+        path = export_path(directory, table, fmt)
+        exported = export_table_parquet(table, path) if fmt == 'parquet' else export_table_csv(table, path)
+        results[table] = path if exported else None
+    return results
@@ -1,5 +1,13 @@
 from database.db_connection import DatabaseConnection
 
+DEFAULT_QUESTIONS = [
+    "What is the current performance of this stock compared to its recent historical trend?",
+    "Is this stock considered overvalued or undervalued based on current analyst targets and earnings data?",
+    "What are the key financial strengths or weaknesses of this company based on its latest financial statements?",
+    "What do recent insider and institutional activities suggest about confidence in this stock?",
+    "How does the stock's volatility and risk profile compare to the broader market?"
+]
+
 def insert_question(question_text):
     try:
         with DatabaseConnection() as db:
@@ -12,9 +20,7 @@ def insert_question(question_text):
                 RETURNING id
             """
             
-            db.cursor.execute(query, (question_text,))
-            result = db.cursor.fetchone()
-            db.connection.commit()
+            result = db.execute_returning(query, (question_text,))
             
             return result['id'] if result else None
     except Exception:
@@ -51,15 +57,7 @@ def initialize_default_questions():
         questions = get_all_questions()
         
         if not questions:
-            default_questions = [
-                "What is the current performance of this stock compared to its recent historical trend?",
-                "Is this stock considered overvalued or undervalued based on current analyst targets and earnings data?",
-                "What are the key financial strengths or weaknesses of this company based on its latest financial statements?",
-                "What do recent insider and institutional activities suggest about confidence in this stock?",
-                "How does the stock's volatility and risk profile compare to the broader market?"
-            ]
-            
-            for question in default_questions:
+            for question in DEFAULT_QUESTIONS:
                 insert_question(question)
         
         return True
@@ -0,0 +1,51 @@
+from database.db_connection import DatabaseConnection
+
+def ensure_quota_table():
+    try:
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return False
+            
+            query = """
+                CREATE TABLE IF NOT EXISTS api_usage (
+                    provider TEXT NOT NULL,
+                    usage_date DATE NOT NULL,
+                    calls INTEGER NOT NULL DEFAULT 0,
+                    tokens BIGINT NOT NULL DEFAULT 0,
+                    PRIMARY KEY (provider, usage_date)
+                )
+            """
+            return db.execute_query(query)
+    except Exception:
+        return False
+
+def get_usage(usage_date):
+    """Return {provider: {'calls': n, 'tokens': n}} recorded for a day"""
+    try:
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return {}
+            
+            query = "SELECT provider, calls, tokens FROM api_usage WHERE usage_date = %s"
+            results = db.fetch_all(query, (usage_date.isoformat(),))
+            return {row['provider']: {'calls': row['calls'], 'tokens': row['tokens']} for row in results}
+    except Exception:
+        return {}
+
+def add_usage(provider, usage_date, calls=0, tokens=0):
+    """Atomically add calls and tokens to a provider's daily counters"""
+    try:
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return False
+            
+            query = """
+                INSERT INTO api_usage (provider, usage_date, calls, tokens)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (provider, usage_date) DO UPDATE SET
+                    calls = api_usage.calls + EXCLUDED.calls,
+                    tokens = api_usage.tokens + EXCLUDED.tokens
+            """
+            return db.execute_query(query, (provider, usage_date.isoformat(), calls, tokens))
+    except Exception:
+        return False
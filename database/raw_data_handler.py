@@ -1,57 +1,112 @@
 import json
+import threading
+import math
+import zlib
+from array import array
 from datetime import datetime, date
 import decimal
+from config import RAW_DATA_CONFIG
+from data_extraction.history import history_columns
 from database.db_connection import DatabaseConnection
 
+_schema_ready = False
+_dictionaries = {}
+_current_dictionary = None
+_dictionaries_lock = threading.Lock()
+
+def ensure_payload_columns():
+    """Add the payload/codec/summary columns and the dictionary table once per process"""
+    global _schema_ready
+    if _schema_ready:
+        return True
+    
+    try:
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return False
+            
+            if db.dialect == 'postgres':
+                queries = [
+                    """
+                    ALTER TABLE raw_data
+                        ADD COLUMN IF NOT EXISTS payload BYTEA,
+                        ADD COLUMN IF NOT EXISTS codec TEXT,
+                        ADD COLUMN IF NOT EXISTS summary JSONB
+                    """,
+                    "ALTER TABLE raw_data ALTER COLUMN raw_data DROP NOT NULL",
+                    """
+                    CREATE TABLE IF NOT EXISTS payload_dictionaries (
+                        id BIGINT PRIMARY KEY,
+                        dictionary BYTEA NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                    """
+                ]
+            else:
+                existing = {row['name'] for row in db.fetch_all("PRAGMA table_info(raw_data)")}
+                queries = [f"ALTER TABLE raw_data ADD COLUMN {column}" for name, column in (
+                    ('payload', 'payload BLOB'),
+                    ('codec', 'codec TEXT'),
+                    ('summary', 'summary TEXT CHECK (summary IS NULL OR json_valid(summary))')
+                ) if name not in existing]
+                queries.append("""
+                    CREATE TABLE IF NOT EXISTS payload_dictionaries (
+                        id INTEGER PRIMARY KEY,
+                        dictionary BLOB NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+            
+            _schema_ready = all(db.execute_query(query) for query in queries)
+            return _schema_ready
+    except Exception:
+        return False
+
 def insert_raw_data(symbol, data_type, raw_data):
-    """Insert raw FMP data into database"""
+    """Insert raw FMP data into database as an encoded payload plus a small JSON summary"""
     try:
+        ensure_payload_columns()
+        payload, codec = encode_payload(raw_data)
+        summary = json.dumps(summarize_payload(symbol, raw_data))
+        
         with DatabaseConnection() as db:
             if not db.connection:
                 return False
             
-            converted_data = convert_data(raw_data)
-            json_data = json.dumps(converted_data)
-            
             # Delete existing data for this symbol
             delete_query = "DELETE FROM raw_data WHERE symbol = %s"
             db.execute_query(delete_query, (symbol,))
             
             # Insert new data
             insert_query = """
-                INSERT INTO raw_data (symbol, raw_data)
-                VALUES (%s, %s)
+                INSERT INTO raw_data (symbol, payload, codec, summary)
+                VALUES (%s, %s, %s, %s)
             """
             
-            return db.execute_query(insert_query, (symbol, json_data))
+            return db.execute_query(insert_query, (symbol, payload, codec, summary))
     except Exception:
         return False
 
 def get_latest_raw_data(symbol, data_type=None):
-    """Get latest raw data for a symbol"""
+    """Get latest raw data for a symbol, decoding compressed payloads transparently"""
     try:
+        ensure_payload_columns()
+        
         with DatabaseConnection() as db:
             if not db.connection:
                 return None
             
             query = """
-                SELECT raw_data FROM raw_data 
-                WHERE symbol = %s 
-                ORDER BY created_at DESC 
+                SELECT raw_data, payload, codec FROM raw_data
+                WHERE symbol = %s
+                ORDER BY created_at DESC
                 LIMIT 1
             """
             
             results = db.fetch_all(query, (symbol,))
             
             if results:
-                raw_data = results[0]['raw_data']
-                
-                if isinstance(raw_data, dict):
-                    return raw_data
-                elif isinstance(raw_data, str):
-                    return json.loads(raw_data)
-                else:
-                    return raw_data
+                return decode_row(results[0])
             return None
     except Exception:
         return None
@@ -63,12 +118,179 @@ def get_combined_raw_data(symbol):
     except Exception:
         return None
 
+def decode_row(row):
+    """Return the payload of a raw_data row, whichever way it was stored"""
+    if row.get('payload') is not None:
+        return decode_payload(row['payload'], row['codec'])
+    
+    raw_data = row.get('raw_data')
+    if isinstance(raw_data, str):
+        return json.loads(raw_data)
+    return raw_data
+
+def summarize_payload(symbol, raw_data):
+    """Small filterable digest kept next to the compressed payload"""
+    quote = (raw_data or {}).get('quote') or {}
+    dates = (history_columns((raw_data or {}).get('historical')) or {}).get('date') or []
+    return convert_data({
+        'symbol': symbol,
+        'price': quote.get('price'),
+        'changesPercentage': quote.get('changesPercentage'),
+        'marketCap': quote.get('marketCap'),
+        'volume': quote.get('volume'),
+        'history_days': len(dates),
+        'latest_date': dates[0] if dates else None
+    })
+
+def get_zstd():
+    """The zstandard module, or None when it is not installed"""
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+def encode_payload(raw_data):
+    """Serialize raw data and compress it with the configured codec; returns (bytes, codec)"""
+    data = json.dumps(convert_data(raw_data), separators=(',', ':')).encode('utf-8')
+    codec = RAW_DATA_CONFIG['codec']
+    zstd = get_zstd() if codec == 'zstd' else None
+    
+    if zstd is not None:
+        dictionary_id, dictionary = get_current_dictionary() if RAW_DATA_CONFIG['use_dictionary'] else (None, None)
+        compressor = zstd.ZstdCompressor(level=RAW_DATA_CONFIG['level'], dict_data=dictionary)
+        return compressor.compress(data), f"zstd:{dictionary_id}" if dictionary_id else 'zstd'
+    if codec in ('zstd', 'zlib'):
+        return zlib.compress(data, RAW_DATA_CONFIG['level']), 'zlib'
+    return data, 'json'
+
+def decode_payload(payload, codec):
+    """Inverse of encode_payload; codec 'zstd:<id>' names the dictionary the payload was trained with"""
+    payload = bytes(payload)
+    
+    if codec.startswith('zstd'):
+        zstd = get_zstd()
+        if zstd is None:
+            raise RuntimeError("zstandard is required to read zstd payloads (pip install zstandard)")
+        
+        dictionary = get_dictionary(int(codec.split(':', 1)[1])) if ':' in codec else None
+        payload = zstd.ZstdDecompressor(dict_data=dictionary).decompress(payload)
+    elif codec == 'zlib':
+        payload = zlib.decompress(payload)
+    
+    return json.loads(payload)
+
+def get_dictionary(dictionary_id):
+    """Load a stored zstd dictionary by id, cached for the life of the process"""
+    with _dictionaries_lock:
+        if dictionary_id in _dictionaries:
+            return _dictionaries[dictionary_id]
+    
+    with DatabaseConnection() as db:
+        if not db or not db.connection:
+            raise RuntimeError("Database unavailable for zstd dictionary lookup")
+        results = db.fetch_all("SELECT dictionary FROM payload_dictionaries WHERE id = %s", (dictionary_id,))
+    if not results:
+        raise RuntimeError(f"zstd dictionary {dictionary_id} not found")
+    
+    dictionary = get_zstd().ZstdCompressionDict(bytes(results[0]['dictionary']))
+    with _dictionaries_lock:
+        _dictionaries[dictionary_id] = dictionary
+    return dictionary
+
+def get_current_dictionary():
+    """Return (id, dictionary) of the newest trained dictionary, or (None, None); looked up once per process"""
+    global _current_dictionary
+    with _dictionaries_lock:
+        if _current_dictionary is not None:
+            return _current_dictionary
+    
+    current = (None, None)
+    try:
+        with DatabaseConnection() as db:
+            if db and db.connection:
+                results = db.fetch_all("SELECT id FROM payload_dictionaries ORDER BY created_at DESC, id DESC LIMIT 1")
+                if results:
+                    current = (results[0]['id'], None)
+        if current[0] is not None:
+            current = (current[0], get_dictionary(current[0]))
+    except Exception:
+        current = (None, None)
+    
+    with _dictionaries_lock:
+        _current_dictionary = current
+    return current
+
+def payload_samples(document):
+    """Split a decoded payload into training samples: one per section and one per price-history column.
+    
+    There is one raw_data row per symbol and run, so a small universe has too
+    few whole payloads for zstd to train on; the pieces carry the same keys
+    and number formats.
+    """
+    for key, value in document.items():
+        columns = value.get('columns') if isinstance(value, dict) else None
+        if isinstance(columns, dict):
+            for column, values in columns.items():
+                yield json.dumps({column: values}, separators=(',', ':')).encode('utf-8')
+        else:
+            yield json.dumps({key: value}, separators=(',', ':')).encode('utf-8')
+
+def train_payload_dictionary(sample_size=None):
+    """Train a zstd dictionary on the latest stored payloads and store it; returns its id or None.
+    
+    Later inserts compress with it; rows written with earlier dictionaries stay readable.
+    When there is too little data to train on, inserts keep compressing without one.
+    """
+    zstd = get_zstd()
+    if zstd is None or not ensure_payload_columns():
+        return None
+    
+    sample_size = sample_size or RAW_DATA_CONFIG['dictionary_samples']
+    samples = []
+    with DatabaseConnection() as db:
+        if not db or not db.connection:
+            return None
+        query = "SELECT raw_data, payload, codec FROM raw_data ORDER BY created_at DESC"
+        for row in db.iter_rows(query, batch_size=100):
+            samples.extend(payload_samples(decode_row(row)))
+            if len(samples) >= sample_size:
+                break
+    
+    if not samples:
+        return None
+    
+    try:
+        dictionary = zstd.train_dictionary(RAW_DATA_CONFIG['dictionary_size'], samples)
+    except zstd.ZstdError as e:
+        print(f"Dictionary training on {len(samples)} samples failed, keeping plain zstd: {e}")
+        return None
+    dictionary_id = dictionary.dict_id()
+    
+    with DatabaseConnection() as db:
+        if not db or not db.connection:
+            return None
+        stored = db.execute_query(
+            "INSERT INTO payload_dictionaries (id, dictionary) VALUES (%s, %s)",
+            (dictionary_id, dictionary.as_bytes())
+        )
+    if not stored:
+        return None
+    
+    global _current_dictionary
+    with _dictionaries_lock:
+        _dictionaries[dictionary_id] = dictionary
+        _current_dictionary = (dictionary_id, dictionary)
+    return dictionary_id
+
 def convert_data(obj):
     """Convert data to JSON-serializable format"""
     if isinstance(obj, dict):
         return {str(key): convert_data(value) for key, value in obj.items()}
     elif isinstance(obj, (list, tuple)):
         return [convert_data(item) for item in obj]
+    elif isinstance(obj, array):
+        return [None if math.isnan(value) else value for value in obj]
     elif isinstance(obj, (datetime, date)):
         return obj.isoformat()
     elif isinstance(obj, decimal.Decimal):
@@ -76,4 +298,4 @@ def convert_data(obj):
     elif obj is None:
         return None
     else:
-        return obj
\ No newline at end of file
+        return obj
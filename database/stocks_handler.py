@@ -39,6 +39,54 @@ def insert_or_update_stock(symbol, name=None, country=None, sector=None, region=
     except Exception:
         return False
 
+def bulk_upsert_stocks(stock_rows):
+    """Upsert many stocks in one INSERT ... ON CONFLICT statement.
+
+    Each row is a dict with 'symbol' and any of the stocks columns; missing or
+    None values keep what is already stored. New rows without a name use the symbol.
+    Rows for the same symbol are merged first, since one statement cannot update
+    a row twice.
+    """
+    try:
+        if not stock_rows:
+            return True
+        
+        merged = {}
+        for row in stock_rows:
+            merged.setdefault(row['symbol'], {}).update(
+                {column: value for column, value in row.items() if value is not None})
+        
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return False
+            
+            columns = ('symbol', 'name', 'country', 'sector', 'region', 'industry',
+                       'exchange', 'currency', 'ipo_year', 'isin')
+            values = []
+            for row in merged.values():
+                row = dict(row, name=row.get('name') or row['symbol'])
+                values.append(tuple(row.get(column) for column in columns))
+            query = """
+                INSERT INTO stocks (symbol, name, country, sector, region, industry,
+                                    exchange, currency, ipo_year, isin)
+                VALUES %s
+                ON CONFLICT (symbol) DO UPDATE SET
+                    name = COALESCE(NULLIF(EXCLUDED.name, EXCLUDED.symbol), stocks.name),
+                    country = COALESCE(EXCLUDED.country, stocks.country),
+                    sector = COALESCE(EXCLUDED.sector, stocks.sector),
+                    region = COALESCE(EXCLUDED.region, stocks.region),
+                    industry = COALESCE(EXCLUDED.industry, stocks.industry),
+                    exchange = COALESCE(EXCLUDED.exchange, stocks.exchange),
+                    currency = COALESCE(EXCLUDED.currency, stocks.currency),
+                    ipo_year = COALESCE(EXCLUDED.ipo_year, stocks.ipo_year),
+                    isin = COALESCE(EXCLUDED.isin, stocks.isin)
+            """
+            
+            return db.execute_values(query, values)
+    except Exception as e:
+        print(f"Bulk stock upsert failed: {e}")
+        return False
+
 def get_stock_info(symbol):
     try:
         with DatabaseConnection() as db:
@@ -67,6 +115,16 @@ def get_all_stocks():
     except Exception:
         return []
 
+def iter_all_stocks(batch_size=1000):
+    """Stream every stock row as a dict through a server-side cursor"""
+    with DatabaseConnection() as db:
+        if not db or not db.connection:
+            return
+        
+        query = "SELECT * FROM stocks ORDER BY symbol"
+        for row in db.iter_rows(query, batch_size=batch_size):
+            yield dict(row)
+
 def extract_stock_info_from_fmp(fmp_data):
     """Extract stock information from FMP data structure"""
     try:
@@ -88,4 +146,46 @@ def extract_stock_info_from_fmp(fmp_data):
             'isin': None
         }
     except Exception:
-        return {}
\ No newline at end of file
+        return {}
+
+def extract_stock_info_from_profile(symbol, profile):
+    """Map an FMP company profile onto the stocks columns"""
+    try:
+        if not profile:
+            return {'symbol': symbol}
+        
+        ipo_date = profile.get('ipoDate') or ''
+        return {
+            'symbol': symbol,
+            'name': profile.get('companyName'),
+            'exchange': profile.get('exchangeShortName'),
+            'country': profile.get('country'),
+            'sector': profile.get('sector'),
+            'industry': profile.get('industry'),
+            'currency': profile.get('currency'),
+            'ipo_year': int(ipo_date[:4]) if ipo_date[:4].isdigit() else None,
+            'isin': profile.get('isin')
+        }
+    except Exception:
+        return {'symbol': symbol}
+
+def iter_stock_symbols(batch_size=1000):
+    """Lazily yield every symbol in the stocks table without loading the full table"""
+    with DatabaseConnection() as db:
+        if not db or not db.connection:
+            return
+        
+        query = "SELECT symbol FROM stocks ORDER BY symbol"
+        for row in db.iter_rows(query, batch_size=batch_size):
+            yield row['symbol']
+
+def count_stocks():
+    try:
+        with DatabaseConnection() as db:
+            if not db or not db.connection:
+                return 0
+            
+            results = db.fetch_all("SELECT COUNT(*) AS count FROM stocks")
+            return results[0]['count'] if results else 0
+    except Exception:
+        return 0
@@ -1,62 +1,187 @@
-from groq import Groq
 import os
-import json
-from llm_analysis.prompt_processor import create_batch_analysis_prompt, parse_batch_response
+from concurrent.futures import ThreadPoolExecutor
+from config import MODEL_ROUTING, RESILIENCE_CONFIG
+from data_extraction.history import history_records
+from database.questions_handler import get_all_questions
+from pipeline.quota import has_call_budget, record_usage
+from pipeline.resilience import ProviderError, get_breaker, get_run_deadline, is_provider_failure, is_transient_status
+from llm_analysis.model_router import get_tier, group_questions, sections_for
+from llm_analysis.prompt_processor import create_batch_analysis_prompt, parse_batch_response, encode_prompt_data
 
-def analyze_stock_batch_groq(symbol, raw_data=None):
-    """Analyze all questions for a stock in one API call with FMP data"""
-    try:
+_client = None
+_executor = None
+
+def get_groq_client():
+    """Return a shared Groq client, importing the SDK on first use; None without an API key"""
+    global _client
+    if _client is None:
         api_key = os.getenv('GROQ_API_KEY')
         if not api_key:
-            return {}
+            return None
         
-        client = Groq(api_key=api_key)
-        prompt = create_batch_analysis_prompt(symbol, raw_data)
+        from groq import Groq
+        # No SDK-level retries: the breaker, run deadline and RetryQueue own retrying
+        _client = Groq(api_key=api_key, max_retries=0)
+    return _client
+
+def create_completion(client, prompt, **kwargs):
+    """Send one chat completion through the Groq circuit breaker, capped by the run deadline.
+
+    Raises ProviderError when the call is skipped because the breaker is open,
+    the run deadline has passed or today's quota is spent, and for API errors
+    after recording them. Calls and tokens go to the quota ledger.
+    """
+    breaker = get_breaker('groq')
+    deadline = get_run_deadline()
+    if deadline.expired():
+        raise ProviderError('groq', "run deadline reached", transient=False)
+    if not has_call_budget('groq'):
+        raise ProviderError('groq', "daily quota spent", transient=False)
+    if not breaker.allow_request():
+        raise ProviderError('groq', "circuit open", sent=False)
+    
+    try:
+        chat_completion = client.chat.completions.create(
+            messages=[{"role": "user", "content": prompt}],
+            timeout=deadline.timeout(RESILIENCE_CONFIG['groq_timeout']),
+            **kwargs
+        )
+    except Exception as e:
+        record_usage('groq')
+        status_code = getattr(e, 'status_code', None)
+        if is_provider_failure(status_code):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise ProviderError('groq', str(e), status_code, is_transient_status(status_code)) from e
+    
+    usage = getattr(chat_completion, 'usage', None)
+    record_usage('groq', tokens=getattr(usage, 'total_tokens', 0) or 0)
+    breaker.record_success()
+    return chat_completion
+
+def build_group_prompt(symbol, raw_data, indicators, questions, timeframes=None):
+    """The prompt one question group's completion is sent: only the data sections its questions need,
+    truncated to stay under the model's context"""
+    prompt = create_batch_analysis_prompt(symbol, raw_data, indicators, questions, timeframes, sections_for(questions))
+    
+    if not prompt:
+        return None
+    
+    # Monitor prompt size for Groq limits
+    prompt_length = len(prompt)
+    estimated_tokens = prompt_length // 4
+    
+    # Truncate if too close to token limit
+    if estimated_tokens > 6000:
+        max_chars = 6000 * 4
+        prompt = prompt[:max_chars] + "\n\nPlease analyze the available data and provide answers:"
+    return prompt
+
+def analyze_question_group(client, symbol, raw_data, indicators, questions, tier, timeframes=None):
+    """Answer one group of questions with its tier's model in a single completion"""
+    prompt = build_group_prompt(symbol, raw_data, indicators, questions, timeframes)
+    
+    if not prompt:
+        return {}
+    
+    settings = get_tier(tier)
+    try:
+        chat_completion = create_completion(
+            client, prompt,
+            model=settings['model'],
+            max_tokens=settings['max_tokens'],
+            temperature=0.7,
+            top_p=1,
+            stream=False
+        )
+        
+        response = chat_completion.choices[0].message.content
         
-        if not prompt:
+        if not response or len(response.strip()) < 20:
             return {}
         
-        # Monitor prompt size for Groq limits
-        prompt_length = len(prompt)
-        estimated_tokens = prompt_length // 4
+        # Parse the batch response to extract individual answers
+        answers = parse_batch_response(response, symbol)
         
-        # Truncate if too close to token limit
-        if estimated_tokens > 6000:
-            max_chars = 6000 * 4
-            prompt = prompt[:max_chars] + "\n\nPlease analyze the available data and provide answers:"
+        if not answers:
+            # Try fallback parsing
+            answers = fallback_parse_response(response)
         
+        return answers
+        
+    except Exception as api_error:
+        # Rate limits mention tokens too, but only a smaller prompt fixes a length error
+        if isinstance(api_error, ProviderError) and api_error.transient:
+            raise
+        
+        # Check if it's a token limit error
+        if "token" in str(api_error).lower() or "length" in str(api_error).lower():
+            return analyze_with_minimal_data(symbol, raw_data, client, questions, tier)
+        if isinstance(api_error, ProviderError):
+            raise
+        return {}
+
+def analyze_group_with_retries(client, symbol, raw_data, indicators, questions, tier, timeframes=None):
+    """Answer a question group, retrying only this group when it comes back empty.
+
+    Provider errors are raised at once: retrying a rate limit or outage
+    immediately rarely helps, so the pipeline retries them later with backoff.
+    """
+    for attempt in range(MODEL_ROUTING['group_retries'] + 1):
         try:
-            chat_completion = client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model="llama3-8b-8192",
-                max_tokens=2000,
-                temperature=0.7,
-                top_p=1,
-                stream=False
-            )
-            
-            response = chat_completion.choices[0].message.content
-            
-            if not response or len(response.strip()) < 50:
-                return {}
-            
-            # Parse the batch response to extract individual answers
-            answers = parse_batch_response(response, symbol)
-            
-            if not answers:
-                # Try fallback parsing
-                answers = fallback_parse_response(response)
-            
+            answers = analyze_question_group(client, symbol, raw_data, indicators, questions, tier, timeframes)
+        except ProviderError:
+            raise
+        except Exception:
+            answers = {}
+        if answers or not get_breaker('groq').is_available():
             return answers
-            
-        except Exception as api_error:
-            # Check if it's a token limit error
-            if "token" in str(api_error).lower() or "length" in str(api_error).lower():
-                return analyze_with_minimal_data(symbol, raw_data, client)
-            return {}
+    return {}
+
+def get_executor():
+    """Shared thread pool for parallel question-group completions"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MODEL_ROUTING['max_parallel'], thread_name_prefix='groq')
+    return _executor
+
+def analyze_stock_batch_groq(symbol, raw_data=None, indicators=None, timeframes=None, questions=None):
+    """Analyze questions for a stock (all by default), routing each question group to its model tier in parallel.
+
+    Returns (answers, error): answers from every group that succeeded, and the
+    ProviderError of a failed group (a transient one if any) or None.
+    """
+    try:
+        client = get_groq_client()
+        if not client:
+            return {}, None
+        
+        if questions is None:
+            questions = get_all_questions()
+        if not questions:
+            return {}, None
+        
+        groups = group_questions(questions)
+        futures = [
+            get_executor().submit(analyze_group_with_retries, client, symbol, raw_data, indicators, group, tier, timeframes)
+            for tier, group in groups.items()
+        ]
+        
+        answers = {}
+        error = None
+        for future in futures:
+            try:
+                answers.update(future.result())
+            except ProviderError as e:
+                if error is None or (e.transient and not error.transient):
+                    error = e
+            except Exception:
+                pass
+        return answers, error
         
     except Exception:
-        return {}
+        return {}, None
 
 def fallback_parse_response(response):
     """Fallback parser that's more flexible with response format"""
@@ -82,19 +207,19 @@ def fallback_parse_response(response):
     except Exception:
         return {}
 
-def analyze_with_minimal_data(symbol, raw_data, client):
+def analyze_with_minimal_data(symbol, raw_data, client, questions=None, tier=None):
     """Fallback analysis with minimal data when token limits are hit"""
     try:
         minimal_data = extract_minimal_data(raw_data, symbol)
         
-        from database.questions_handler import get_all_questions
-        questions = get_all_questions()
+        if questions is None:
+            questions = get_all_questions()
         
         if not questions:
             return {}
         
         questions_text = ""
-        for q in questions[:3]:
+        for q in questions:
             questions_text += f"{q['id']}: {q['question_text']}\n"
         
         minimal_prompt = f"""
@@ -103,15 +228,15 @@ Analyze this stock data and answer these questions concisely (≤50 words each):
 {questions_text}
 
 Data for {symbol}:
-{json.dumps(minimal_data, indent=1)}
+{encode_prompt_data(minimal_data)}
 
 Format each answer as: "Answer X: [your answer]" where X is the question number.
 """
         
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": minimal_prompt}],
-            model="llama3-8b-8192",
-            max_tokens=1000,
+        chat_completion = create_completion(
+            client, minimal_prompt,
+            model=get_tier(tier)['model'],
+            max_tokens=get_tier(tier)['max_tokens'],
             temperature=0.7
         )
         
@@ -137,29 +262,24 @@ def extract_minimal_data(raw_data, symbol):
             }
         
         if raw_data and raw_data.get('historical'):
-            historical = raw_data['historical'].get('historical', [])
+            historical = history_records(raw_data['historical'], 3)
             if historical:
-                minimal['recent'] = historical[:3]
+                minimal['recent'] = historical
         
         return minimal
     except Exception:
         return {'symbol': symbol, 'error': 'data_extraction_failed'}
 
-def test_groq_connection():
-    """Test Groq API connection"""
+def test_groq_connection(timeout=None):
+    """Test Groq API connection by listing models, which spends no tokens"""
     try:
-        api_key = os.getenv('GROQ_API_KEY')
-        if not api_key:
+        client = get_groq_client()
+        if not client:
             return False
         
-        client = Groq(api_key=api_key)
-        test_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": "Test connection. Respond with 'OK'."}],
-            model="llama3-8b-8192",
-            max_tokens=50
-        )
-        
-        response = test_completion.choices[0].message.content
-        return "OK" in response or "ok" in response.lower()
+        if timeout:
+            client = client.with_options(timeout=timeout, max_retries=0)
+        models = client.models.list()
+        return bool(models.data)
     except Exception:
         return False
\ No newline at end of file
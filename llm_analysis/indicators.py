@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from config import INDICATOR_CONFIG
+
+TRADING_DAYS = 252
+
+def history_frame(histories, fields):
+    """Stack {symbol: history columns} into one long symbol/date frame of the requested numeric fields"""
+    histories = [(symbol, columns) for symbol, columns in histories.items() if columns and len(columns['date'])]
+    if not histories:
+        return None
+    
+    lengths = [len(columns['date']) for _, columns in histories]
+    data = {
+        'symbol': np.repeat([symbol for symbol, _ in histories], lengths),
+        'date': pd.to_datetime(np.concatenate([np.asarray(columns['date'], dtype=object) for _, columns in histories]))
+    }
+    for field in fields:
+        # array('d') columns are wrapped without copying; stored lists turn None into NaN
+        data[field] = np.concatenate([
+            np.asarray(columns[field], dtype=float) if field in columns else np.full(length, np.nan)
+            for (_, columns), length in zip(histories, lengths)
+        ])
+    return pd.DataFrame(data)
+
+def build_price_frames(histories):
+    """Pivot {symbol: history columns} into date x symbol close/high/low frames"""
+    prices = history_frame(histories, ('high', 'low', 'close'))
+    if prices is None:
+        return None
+    
+    prices = prices.drop_duplicates(['date', 'symbol'], keep='last').set_index(['date', 'symbol'])
+    wide = prices[['close', 'high', 'low']].unstack('symbol').sort_index()
+    close = wide['close'].ffill()
+    high = wide['high'].reindex(columns=close.columns)
+    low = wide['low'].reindex(columns=close.columns)
+    return close, high, low
+
+def trailing_return(close, periods):
+    """Percent change over the last `periods` rows for every column"""
+    if len(close) <= periods:
+        return pd.Series(np.nan, index=close.columns)
+    return (close.iloc[-1] / close.iloc[-1 - periods] - 1) * 100
+
+def wilder_rsi(close, window):
+    delta = close.diff()
+    gain = delta.clip(lower=0).ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+    loss = (-delta.clip(upper=0)).ewm(alpha=1 / window, min_periods=window, adjust=False).mean()
+    return (100 - 100 / (1 + gain / loss)).iloc[-1]
+
+def average_true_range(close, high, low, window):
+    prev_close = close.shift(1).to_numpy()
+    high, low = high.to_numpy(), low.to_numpy()
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    true_range = pd.DataFrame(true_range, index=close.index, columns=close.columns)
+    return true_range.ewm(alpha=1 / window, min_periods=window, adjust=False).mean().iloc[-1]
+
+def beta_against(returns, benchmark_returns, min_periods):
+    """Beta of every column against the benchmark, using only dates where both have returns"""
+    benchmark = benchmark_returns.reindex(returns.index).to_numpy()[:, None]
+    values = returns.to_numpy()
+    mask = ~np.isnan(values) & ~np.isnan(benchmark)
+    count = mask.sum(axis=0)
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_r = np.where(mask, values, 0).sum(axis=0) / count
+        mean_b = np.where(mask, benchmark, 0).sum(axis=0) / count
+        covariance = np.where(mask, (values - mean_r) * (benchmark - mean_b), 0).sum(axis=0)
+        variance = np.where(mask, (benchmark - mean_b) ** 2, 0).sum(axis=0)
+        beta = covariance / variance
+    
+    beta[count < min_periods] = np.nan
+    return pd.Series(beta, index=returns.columns)
+
+def compute_universe_indicators(histories, benchmark_history=None):
+    """Compute technical indicators for many symbols at once as 2D array operations.
+
+    histories maps symbol -> history columns (any order); benchmark_history is
+    the benchmark index's columns. Returns {symbol: {indicator: value}} with
+    values rounded and missing ones (too little history) left out.
+    """
+    try:
+        frames = build_price_frames(histories)
+        if frames is None:
+            return {}
+        
+        close, high, low = frames
+        returns = close.pct_change(fill_method=None)
+        windows = INDICATOR_CONFIG
+        
+        ma_short = close.rolling(windows['ma_short']).mean().iloc[-1]
+        ma_long = close.rolling(windows['ma_long']).mean().iloc[-1]
+        last_close = close.iloc[-1]
+        
+        indicators = pd.DataFrame({
+            'return_1d_pct': trailing_return(close, 1),
+            'return_5d_pct': trailing_return(close, 5),
+            'return_20d_pct': trailing_return(close, 20),
+            'volatility_20d_pct': returns.rolling(20, min_periods=10).std().iloc[-1] * np.sqrt(TRADING_DAYS) * 100,
+            f"vs_ma{windows['ma_short']}_pct": (last_close / ma_short - 1) * 100,
+            f"vs_ma{windows['ma_long']}_pct": (last_close / ma_long - 1) * 100,
+            'rsi': wilder_rsi(close, windows['rsi_window']),
+            'atr_pct': average_true_range(close, high, low, windows['atr_window']) / last_close * 100,
+            'max_drawdown_pct': (close / close.cummax() - 1).min() * 100
+        })
+        
+        if benchmark_history:
+            benchmark_frames = build_price_frames({'benchmark': benchmark_history})
+            if benchmark_frames is not None:
+                benchmark_returns = benchmark_frames[0]['benchmark'].pct_change(fill_method=None)
+                indicators['beta'] = beta_against(returns, benchmark_returns, windows['beta_min_periods'])
+        
+        return {
+            symbol: {name: value for name, value in row.items() if pd.notna(value)}
+            for symbol, row in indicators.round(2).to_dict('index').items()
+        }
+    except Exception as e:
+        print(f"Indicator computation failed: {e}")
+        return {}
@@ -0,0 +1,32 @@
+from config import MODEL_ROUTING, MODEL_TIERS
+
+def route_question(question):
+    """Return the model tier for a question template based on keywords in its text"""
+    text = (question.get('question_text') or '').lower()
+    for keyword, tier in MODEL_ROUTING['keyword_tiers'].items():
+        if keyword in text and tier in MODEL_TIERS:
+            return tier
+    return MODEL_ROUTING['default_tier']
+
+def group_questions(questions):
+    """Group question templates by tier, preserving question order within each group"""
+    groups = {}
+    for question in questions:
+        groups.setdefault(route_question(question), []).append(question)
+    return groups
+
+def sections_for(questions):
+    """Prompt data sections a question group needs, or None when any question needs all of them"""
+    sections = set()
+    for question in questions:
+        text = (question.get('question_text') or '').lower()
+        matched = [names for keyword, names in MODEL_ROUTING['keyword_sections'].items() if keyword in text]
+        if not matched:
+            return None
+        for names in matched:
+            sections.update(names)
+    return sections
+
+def get_tier(tier):
+    """Return the model and token cap for a tier, falling back to the default tier"""
+    return MODEL_TIERS.get(tier) or MODEL_TIERS[MODEL_ROUTING['default_tier']]
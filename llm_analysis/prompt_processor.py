@@ -1,10 +1,14 @@
 import json
-from config import BASE_ANALYSIS_PROMPT, DATA_LIMITS
+from config import BASE_ANALYSIS_PROMPT, COMPACT_DATA_LEGEND, DATA_LIMITS, PROMPT_CONFIG
+from data_extraction.history import history_records
 from database.raw_data_handler import get_combined_raw_data
 from database.questions_handler import get_all_questions
 
-def create_batch_analysis_prompt(symbol, raw_data=None):
-    """Creates a prompt with all questions for batch analysis using FMP data"""
+def create_batch_analysis_prompt(symbol, raw_data=None, indicators=None, questions=None, timeframes=None, sections=None):
+    """Creates a prompt with the given questions (all questions by default) for batch analysis using FMP data.
+
+    sections, if given, limits the data to those top-level sections of the optimized payload.
+    """
     try:
         if raw_data is None:
             raw_data = get_combined_raw_data(symbol)
@@ -12,7 +16,8 @@ def create_batch_analysis_prompt(symbol, raw_data=None):
         if not raw_data:
             return None
         
-        questions = get_all_questions()
+        if questions is None:
+            questions = get_all_questions()
         if not questions:
             return None
         
@@ -20,24 +25,32 @@ def create_batch_analysis_prompt(symbol, raw_data=None):
         for q in questions:
             questions_text += f"{q['id']}: {q['question_text']}\n"
         
-        optimized_data = optimize_data_for_tokens(raw_data, symbol)
-        data_json = json.dumps(optimized_data, default=str, indent=1)
+        optimized_data = optimize_data_for_tokens(raw_data, symbol, indicators, timeframes)
+        if sections is not None:
+            optimized_data = {key: value for key, value in optimized_data.items()
+                              if key in sections or key in ('symbol', 'data_source')}
+        data_text = encode_prompt_data(optimized_data)
         
-        if len(data_json) > DATA_LIMITS['max_json_size']:
-            data_json = data_json[:DATA_LIMITS['max_json_size']] + "..."
+        if len(data_text) > DATA_LIMITS['max_json_size']:
+            data_text = data_text[:DATA_LIMITS['max_json_size']] + "..."
         
         full_prompt = BASE_ANALYSIS_PROMPT.format(
             symbol=symbol,
             questions=questions_text,
-            json_data=data_json
+            data_format='' if PROMPT_CONFIG['encoding'] == 'json' else COMPACT_DATA_LEGEND,
+            data=data_text
         )
         
         return full_prompt
     except Exception:
         return None
 
-def optimize_data_for_tokens(raw_data, symbol):
-    """Optimize FMP data structure to minimize token usage while preserving analysis value"""
+def optimize_data_for_tokens(raw_data, symbol, indicators=None, timeframes=None):
+    """Optimize FMP data structure to minimize token usage while preserving analysis value.
+
+    When precomputed indicators or daily/weekly/monthly timeframe bars are
+    given they replace the raw price bars.
+    """
     try:
         optimized = {
             'symbol': symbol,
@@ -73,10 +86,15 @@ def optimize_data_for_tokens(raw_data, symbol):
                 }
             }
         
+        if indicators:
+            optimized['indicators'] = indicators
+        
+        if timeframes:
+            optimized.update(timeframes)
+        
         # Process historical data (keep only essential recent data)
-        if raw_data.get('historical') and raw_data['historical'].get('historical'):
-            historical = raw_data['historical']['historical']
-            recent_history = historical[:7] if len(historical) >= 7 else historical
+        elif not indicators and history_records(raw_data.get('historical'), 1):
+            recent_history = history_records(raw_data['historical'], 7)
             
             optimized['price_history'] = []
             for record in recent_history:
@@ -88,7 +106,7 @@ def optimize_data_for_tokens(raw_data, symbol):
                 })
         
         # Add computed metrics for analysis
-        if optimized.get('current_market') and optimized.get('price_history'):
+        if optimized.get('current_market'):
             try:
                 current_price = optimized['current_market']['price']
                 year_high = optimized['current_market']['year_range']['high']
@@ -107,6 +125,107 @@ def optimize_data_for_tokens(raw_data, symbol):
     except Exception:
         return raw_data
 
+# Short names for the compact encoding; nested keys are joined with '_' before lookup
+COMPACT_ALIASES = {
+    'current_market': 'quote',
+    'price_history': 'history',
+    'computed_metrics': 'metrics',
+    'data_source': 'source',
+    'change': 'chg',
+    'change_percent': 'chg%',
+    'change_pct': 'chg%',
+    'open': 'o',
+    'high': 'h',
+    'low': 'l',
+    'close': 'c',
+    'volume': 'vol',
+    'market_cap': 'mcap',
+    'pe_ratio': 'pe',
+    'day_range_low': 'day_lo',
+    'day_range_high': 'day_hi',
+    'year_range_low': 'yr_lo',
+    'year_range_high': 'yr_hi',
+    'averages_volume_avg': 'avg_vol',
+    'averages_price_50d': 'ma50',
+    'averages_price_200d': 'ma200',
+    'fundamentals_eps': 'eps',
+    'fundamentals_shares_outstanding': 'shares',
+    'year_range_position_percent': 'yr_range_pos%',
+    'distance_from_high_percent': 'off_yr_high%',
+    'return_1d_pct': 'ret1d%',
+    'return_5d_pct': 'ret5d%',
+    'return_20d_pct': 'ret20d%',
+    'volatility_20d_pct': 'volat20d%',
+    'vs_ma20_pct': 'vs_ma20%',
+    'vs_ma50_pct': 'vs_ma50%',
+    'atr_pct': 'atr%',
+    'max_drawdown_pct': 'max_dd%'
+}
+
+NUMBER_SUFFIXES = ((1e12, 'T'), (1e9, 'B'), (1e6, 'M'), (1e4, 'K'))
+
+def encode_prompt_data(optimized_data):
+    """Serialize optimized data for the prompt using the configured encoding"""
+    if PROMPT_CONFIG['encoding'] == 'json':
+        return json.dumps(optimized_data, default=str, indent=1)
+    return encode_compact(optimized_data)
+
+def format_number(value, digits=None):
+    """Round to significant digits, using K/M/B/T suffixes for large magnitudes"""
+    digits = digits or PROMPT_CONFIG['significant_digits']
+    
+    if value is None:
+        return ''
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return str(value)
+    if value == 0:
+        # -0.0 would otherwise print as '-0'
+        return '0'
+    
+    for threshold, suffix in NUMBER_SUFFIXES:
+        if abs(value) >= threshold:
+            return f"{value / threshold:.{digits}g}{suffix}"
+    return f"{value:.{digits}g}"
+
+def flatten_section(section, prefix=''):
+    """Flatten nested dicts into (compact_key, value) pairs"""
+    pairs = []
+    for key, value in section.items():
+        full_key = f"{prefix}{key}"
+        if isinstance(value, dict):
+            pairs.extend(flatten_section(value, f"{full_key}_"))
+        else:
+            pairs.append((COMPACT_ALIASES.get(full_key, full_key), value))
+    return pairs
+
+def encode_compact(optimized_data):
+    """Encode prompt data as key=value lines and header-plus-CSV tables.
+
+    Scalars go on the first line, dict sections become one flattened
+    key=value line and lists of records become a header row plus CSV rows.
+    """
+    try:
+        scalars = []
+        sections = []
+        
+        for key, value in optimized_data.items():
+            name = COMPACT_ALIASES.get(key, key)
+            
+            if isinstance(value, dict):
+                pairs = [f"{k}={format_number(v)}" for k, v in flatten_section(value) if v is not None]
+                sections.append(f"[{name}] " + ' '.join(pairs))
+            elif isinstance(value, list) and value and all(isinstance(row, dict) for row in value):
+                columns = list(dict.fromkeys(column for row in value for column in row))
+                header = ','.join(COMPACT_ALIASES.get(column, column) for column in columns)
+                rows = [','.join(format_number(row.get(column)) for column in columns) for row in value]
+                sections.append(f"[{name}] {header}\n" + '\n'.join(rows))
+            elif value is not None:
+                scalars.append(f"{name}={format_number(value)}")
+        
+        return '\n'.join([' '.join(scalars)] + sections)
+    except Exception:
+        return json.dumps(optimized_data, default=str)
+
 def parse_batch_response(response, symbol):
     """Parse the batch response and extract individual answers"""
     try:
@@ -0,0 +1,71 @@
+import pandas as pd
+from config import TIMEFRAME_CONFIG
+from llm_analysis.indicators import history_frame
+
+# Period used to group daily bars per timeframe; None keeps the daily bars as they are
+TIMEFRAME_PERIODS = {
+    'daily': None,
+    'weekly': 'W-FRI',
+    'monthly': 'M'
+}
+
+def build_bars(histories):
+    """Stack {symbol: history columns} into one long symbol/date OHLCV frame sorted by date"""
+    bars = history_frame(histories, ('open', 'high', 'low', 'close', 'volume'))
+    if bars is None:
+        return None
+    
+    bars = bars.dropna(subset=['close']).drop_duplicates(['symbol', 'date'], keep='last')
+    return bars.sort_values(['symbol', 'date'], kind='stable')
+
+def aggregate_bars(bars, period):
+    """OHLCV per symbol and period, labelled by the period's last trading date"""
+    if period is None:
+        aggregated = bars.set_index(['symbol', 'date'])[['open', 'high', 'low', 'close', 'volume']]
+    else:
+        aggregated = bars.groupby(['symbol', bars['date'].dt.to_period(period)], sort=True).agg(
+            date=('date', 'last'),
+            open=('open', 'first'),
+            high=('high', 'max'),
+            low=('low', 'min'),
+            close=('close', 'last'),
+            volume=('volume', 'sum')
+        ).reset_index(level=1, drop=True).set_index('date', append=True)
+    
+    # Change against the previous bar of the same symbol, before older bars are dropped
+    previous = aggregated['close'].groupby(level='symbol').shift(1)
+    aggregated['change_pct'] = (aggregated['close'] / previous - 1) * 100
+    return aggregated
+
+def compute_universe_timeframes(histories, counts=None):
+    """Downsample many symbols' daily bars into fixed-size daily/weekly/monthly OHLCV summaries.
+    
+    histories maps symbol -> history columns (any order). Returns
+    {symbol: {timeframe: [bar, ...]}} with the newest bar first and at most
+    counts[timeframe] bars per timeframe, so the size stays constant however
+    much history is supplied. The newest weekly/monthly bar may be partial.
+    """
+    try:
+        counts = counts or TIMEFRAME_CONFIG['bars']
+        bars = build_bars(histories)
+        if bars is None:
+            return {}
+        
+        timeframes = {}
+        for timeframe, count in counts.items():
+            aggregated = aggregate_bars(bars, TIMEFRAME_PERIODS[timeframe])
+            latest = aggregated.groupby(level='symbol').tail(count).round(TIMEFRAME_CONFIG['decimals'])
+            latest = latest.reset_index().sort_values(['symbol', 'date'], ascending=[True, False], kind='stable')
+            date_format = '%Y-%m' if timeframe == 'monthly' else '%Y-%m-%d'
+            latest['date'] = latest['date'].dt.strftime(date_format)
+            
+            # One to_dict over the whole frame; per-symbol frame slicing costs more than the resampling
+            for record in latest.to_dict('records'):
+                symbol = record.pop('symbol')
+                timeframes.setdefault(symbol, {}).setdefault(timeframe, []).append(
+                    {name: value for name, value in record.items() if pd.notna(value)}
+                )
+        return timeframes
+    except Exception as e:
+        print(f"Timeframe resampling failed: {e}")
+        return {}
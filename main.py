@@ -1,30 +1,45 @@
+import argparse
+import functools
+import itertools
+import signal
 import sys
+import threading
 import time
+from collections import deque
 from datetime import datetime
 from dotenv import load_dotenv
 
-from config import STOCK_SYMBOLS
-from data_extraction.fmp_fetcher import fetch_fmp_stock_data, test_fmp_connection
-from database.stocks_handler import insert_or_update_stock, extract_stock_info_from_fmp, get_stock_info, get_all_stocks
-from database.questions_handler import initialize_default_questions
-from database.raw_data_handler import insert_raw_data, get_combined_raw_data
+from config import INDICATOR_CONFIG, PIPELINE_CONFIG, RETRY_CONFIG, SCHEDULER_CONFIG, UNIVERSE_CONFIG
+from data_extraction.fmp_fetcher import fetch_fmp_stock_data, fetch_benchmark_history
+from data_extraction.history import history_columns
+from database.stocks_handler import count_stocks
+from database.questions_handler import get_all_questions, initialize_default_questions
+from database.raw_data_handler import insert_raw_data, get_combined_raw_data, train_payload_dictionary
 from database.answers_handler import insert_or_update_answer, verify_answer_stored
-from llm_analysis.groq_analyzer import analyze_stock_batch_groq, test_groq_connection
-from database.db_connection import test_database_connection
+from database.backends import get_backend
+from database.dashboard_handler import refresh_dashboard_view
+from database.export_handler import EXPORT_QUERIES, export_tables
+from llm_analysis.groq_analyzer import analyze_stock_batch_groq
+from pipeline.quota import get_ledger, plan_run
+from pipeline.resilience import ProviderError, get_breaker, get_run_deadline, start_run_deadline
+from pipeline.retry import RetryQueue
+from pipeline.metadata_sync import iter_with_metadata, sync_stock_metadata
+from pipeline.scheduler import RefreshScheduler
+from pipeline.stages import run_stage, iter_batches, throttle
+from pipeline.startup import clear_warm_quotes, run_startup_checks, take_warm_quote, peek
+from pipeline.universe import iter_universe
 
 load_dotenv()
 
-def test_connections():
-    """Test all required connections"""
-    db_ok = test_database_connection()
-    if not db_ok:
+def test_connections(first_symbol=None):
+    """Test all required connections concurrently"""
+    results = run_startup_checks(first_symbol)
+    
+    if not results['database']:
         print("Database connection failed. Cannot proceed.")
         return False
     
-    fmp_ok = test_fmp_connection()
-    groq_ok = test_groq_connection()
-    
-    if not fmp_ok and not groq_ok:
+    if not results['fmp'] and not results['groq']:
         print("Both FMP and Groq connections failed. Cannot proceed.")
         return False
     
@@ -37,40 +52,50 @@ def setup_database():
     except Exception:
         return False
 
-def try_fetch_stock_data(symbol):
-    """Try to fetch and store stock data"""
+def try_fetch_stock_data(symbol, quote_data=None, history_days=None):
+    """Try to fetch and store stock data, returning (payload, error).
+
+    When the history call is skipped, the previously stored history is carried over.
+    error is a ProviderError saying whether a failed fetch is worth retrying. A
+    payload that could not be stored is still returned so the analysis can use it.
+    """
     try:
-        fmp_data = fetch_fmp_stock_data(symbol)
+        try:
+            fmp_data = fetch_fmp_stock_data(symbol, quote_data, history_days)
+        except ProviderError as e:
+            return None, e
         if not fmp_data:
-            return False
+            return None, ProviderError('fmp', f"no data for {symbol}", transient=False)
         
-        stock_info = extract_stock_info_from_fmp(fmp_data)
-        stock_insert_success = insert_or_update_stock(symbol, **stock_info)
+        if not fmp_data.get('historical'):
+            stored = get_combined_raw_data(symbol) or {}
+            fmp_data['historical'] = stored.get('historical')
         
-        if not stock_insert_success:
-            return False
-        
-        return insert_raw_data(symbol, None, fmp_data)
+        if not insert_raw_data(symbol, None, fmp_data):
+            print(f"⚠️  {symbol} raw data not stored")
+        return fmp_data, None
     except Exception:
-        return False
+        return None, None
 
-def try_analyze_stock(symbol):
-    """Try to analyze stock using existing data in DB"""
+def try_analyze_stock(symbol, raw_data=None, indicators=None, timeframes=None, questions=None):
+    """Try to analyze stock, falling back to existing data in DB when no fresh payload is given.
+
+    Returns (answers, error); questions limits the analysis to those still unanswered.
+    """
     try:
-        stock_info = get_stock_info(symbol)
-        if not stock_info:
-            minimal_success = insert_or_update_stock(symbol, name=symbol)
-            if not minimal_success:
-                return False
-        
-        raw_data = get_combined_raw_data(symbol)
         if not raw_data:
-            return False
-        
-        answers = analyze_stock_batch_groq(symbol, raw_data)
-        if not answers:
-            return False
+            raw_data = get_combined_raw_data(symbol)
+        if not raw_data:
+            return {}, None
         
+        answers, error = analyze_stock_batch_groq(symbol, raw_data, indicators, timeframes, questions)
+        return answers or {}, error
+    except Exception:
+        return {}, None
+
+def try_store_answers(symbol, answers):
+    """Store answers for a stock, returning True if at least one was persisted"""
+    try:
         successful_answers = 0
         for question_id, answer_text in answers.items():
             if insert_or_update_answer(symbol, question_id, answer_text):
@@ -81,67 +106,339 @@ def try_analyze_stock(symbol):
     except Exception:
         return False
 
-def process_single_stock(symbol):
-    """Process a single stock: try to fetch data, then analyze"""
+def symbol_delay():
+    """Pause between symbols, skipped while Groq's circuit is open and capped by the run deadline"""
+    if not get_breaker('groq').is_available():
+        return 0
+    return get_run_deadline().timeout(PIPELINE_CONFIG['symbol_delay'])
+
+def within_deadline(symbols):
+    """Stop pulling symbols from the universe once the run deadline has passed"""
+    for symbol in symbols:
+        if get_run_deadline().expired():
+            print("⏰ Run deadline reached; remaining symbols deferred to the next run")
+            return
+        yield symbol
+
+def fetch_stage(symbol, history_days=None):
+    """Pipeline stage: fetch fresh data for a symbol, honouring the quota plan's history depth"""
+    print(f"Processing {symbol}...")
+    days = (history_days or {}).get(symbol)
+    raw_data, error = try_fetch_stock_data(symbol, take_warm_quote(symbol), days)
+    return {'symbol': symbol, 'raw_data': raw_data, 'error': error, 'attempts': 1, 'history_days': days}
+
+def indicator_stage(batch):
+    """Pipeline stage: compute technical indicators and timeframe summaries for a batch in one vectorized pass"""
     try:
-        print(f"Processing {symbol}...")
+        from llm_analysis.indicators import compute_universe_indicators
+        from llm_analysis.timeframes import compute_universe_timeframes
         
-        data_updated = try_fetch_stock_data(symbol)
-        analysis_success = try_analyze_stock(symbol)
+        for item in batch:
+            if not item['raw_data']:
+                item['raw_data'] = get_combined_raw_data(item['symbol'])
         
-        if analysis_success:
-            print(f"✅ {symbol} completed")
-            return True
-        else:
-            print(f"❌ {symbol} failed")
-            return False
+        histories = {
+            item['symbol']: history_columns(item['raw_data'].get('historical'))
+            for item in batch if item['raw_data']
+        }
+        benchmark = fetch_benchmark_history(INDICATOR_CONFIG['benchmark_symbol'])
+        indicators = compute_universe_indicators(histories, benchmark)
+        timeframes = compute_universe_timeframes(histories)
     except Exception:
+        indicators = {}
+        timeframes = {}
+    
+    for item in batch:
+        item['indicators'] = indicators.get(item['symbol'])
+        item['timeframes'] = timeframes.get(item['symbol'])
+    return batch
+
+def analyze_stage(item):
+    """Pipeline stage: answer a fetched symbol's outstanding questions.
+
+    The payload stays on the item so a retry can reuse it; run_pipeline drops
+    it once the symbol is finished.
+    """
+    if not get_breaker('groq').is_available():
+        print(f"⏭️  {item['symbol']} skipped: Groq circuit open")
+        item['answers'] = {}
+        item['error'] = ProviderError('groq', "circuit open", sent=False)
+        return item
+    
+    answers, error = try_analyze_stock(item['symbol'], item.get('raw_data'), item.get('indicators'),
+                                       item.get('timeframes'), item.get('questions'))
+    item['answers'] = answers
+    # Without a payload nothing was analyzed, so the fetch error still explains the failure
+    if error is not None or item.get('raw_data'):
+        item['error'] = error
+    return item
+
+def store_stage(item):
+    """Pipeline stage: commit answers as soon as they arrive; True once any answer for the symbol is stored"""
+    if item['answers'] and try_store_answers(item['symbol'], item['answers']):
+        item['stored'] = True
+    return item.get('stored', False)
+
+def retry_stage(item):
+    """Retry a transiently failed symbol, repeating only the stages it still needs"""
+    item['attempts'] += 1
+    print(f"🔁 Retrying {item['symbol']} (attempt {item['attempts']}): {item['error']}")
+    
+    if not item.get('raw_data'):
+        item['raw_data'], item['error'] = try_fetch_stock_data(item['symbol'], None, item.get('history_days'))
+        indicator_stage([item])
+    return analyze_stage(item)
+
+def prepare_retry(item, questions):
+    """Decide whether a symbol gets another attempt, narrowing it to the questions still unanswered"""
+    error = item.get('error')
+    if error is None or not error.transient:
         return False
+    # A call stopped by an open circuit never reached the provider, so it does not use up an attempt
+    if not error.sent:
+        item['attempts'] -= 1
+    if item['attempts'] >= RETRY_CONFIG['max_attempts']:
+        return False
+    
+    item['questions'] = [q for q in (item.get('questions') or questions) if q['id'] not in item['answers']]
+    return bool(item['questions'])
+
+def run_pipeline(symbols, history_days=None, on_stored=None):
+    """Stream symbols through fetch -> indicators -> analyze -> store with bounded queues between stages.
+
+    Symbols that fail transiently are retried after the main pass with exponential
+    backoff, reusing their fetched payload and answers. Returns (processed,
+    successful, recent_failures); only the most recent failures are kept so memory
+    stays flat regardless of universe size. on_stored, if given, is called with
+    (symbol, success) for every symbol once it is finished.
+    """
+    processed = 0
+    successful = 0
+    recent_failures = deque(maxlen=PIPELINE_CONFIG['max_failures_reported'])
+    questions = get_all_questions()
+    retries = RetryQueue()
+    
+    batch_size = INDICATOR_CONFIG['batch_size']
+    symbols = iter_with_metadata(within_deadline(symbols))
+    fetched = run_stage(symbols, functools.partial(fetch_stage, history_days=history_days), maxsize=batch_size)
+    # Indicators run once per full batch; the Groq pause sits after them so fetching keeps the batch filling
+    enriched = run_stage(iter_batches(fetched, batch_size), indicator_stage, maxsize=1)
+    analyzed = run_stage(throttle(itertools.chain.from_iterable(enriched), symbol_delay), analyze_stage)
+    
+    # The retry queue is drained only after the main pass; retried items can be queued again
+    for item in itertools.chain(analyzed, retries.drain(retry_stage)):
+        symbol = item['symbol']
+        try:
+            stored = store_stage(item)
+        except Exception:
+            stored = item.get('stored', False)
+        
+        if prepare_retry(item, questions) and retries.push(item):
+            print(f"⏳ {symbol} queued for retry: {item['error']}")
+            continue
+        
+        processed += 1
+        for key in ('raw_data', 'indicators', 'timeframes'):
+            item.pop(key, None)
+        
+        if stored:
+            successful += 1
+            print(f"✅ {symbol} completed" + (f" after {item['attempts']} attempts" if item['attempts'] > 1 else ""))
+        else:
+            recent_failures.append(symbol)
+            print(f"❌ {symbol} failed" + (f": {item['error']}" if item.get('error') else ""))
+        if on_stored:
+            on_stored(symbol, stored)
+    
+    return processed, successful, recent_failures
 
-def get_stocks_with_data():
-    """Get list of stocks that have data in the database"""
+def sync_metadata_job():
+    """Refresh company profiles for the whole universe and upsert them in one statement"""
+    symbols = list(iter_universe())
+    print(f"Syncing metadata for {len(symbols)} stocks...")
+    get_ledger().load()
+    
+    if not sync_stock_metadata(symbols):
+        print("Metadata sync failed.")
+        sys.exit(1)
+    print("✅ Metadata sync completed")
+
+def export_job(directory, fmt, tables):
+    """Stream answers, stocks and raw_data snapshots to CSV/Parquet files"""
+    results = export_tables(directory, fmt, tables)
+    for table, path in results.items():
+        print(f"✅ {table} -> {path}" if path else f"❌ {table} export failed")
+    
+    if not all(results.values()):
+        sys.exit(1)
+
+def train_dictionary_job():
+    """Train a zstd dictionary on recent raw_data payloads so new snapshots compress against it"""
+    dictionary_id = train_payload_dictionary()
+    if dictionary_id is None:
+        print("Dictionary training failed (needs zstandard and stored raw_data).")
+        sys.exit(1)
+    print(f"✅ Trained raw_data dictionary {dictionary_id}")
+
+def reload_universe(scheduler):
+    """Pick up symbols added to or removed from the universe since the daemon loaded it"""
     try:
-        stocks_in_db = get_all_stocks()
-        return [stock['symbol'] for stock in stocks_in_db]
-    except:
-        return []
+        symbols = list(iter_universe())
+    except Exception as e:
+        print(f"⚠️  Universe reload failed: {e}")
+        return
+    # An empty universe is more likely a failed read than a real change; keep the current schedule
+    if not symbols:
+        return
+    
+    new_symbols = [symbol for symbol in dict.fromkeys(symbols) if symbol not in scheduler.sessions]
+    if new_symbols:
+        # Their profiles tell the scheduler which exchange session they follow
+        sync_stock_metadata(new_symbols)
+    added, removed = scheduler.update(symbols)
+    if added or removed:
+        print(f"🔄 Universe reloaded: {len(added)} added, {len(removed)} removed")
+
+def daemon_job():
+    """Stay up with warm clients and pooled connections, refreshing each symbol after its exchange closes.
+
+    Runs until SIGTERM/SIGINT; the symbols already in flight are finished and stored first.
+    """
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())
+    
+    print("Starting FMP Stock Analysis daemon...")
+    get_backend().enable_pool(SCHEDULER_CONFIG['pool_size'])
+    symbols = list(iter_universe())
+    
+    if not test_connections(symbols[0] if symbols else None):
+        print("Connection tests failed. Exiting.")
+        sys.exit(1)
+    # The probe's quote may be mid-session; a symbol's refresh must fetch its own post-close quote
+    clear_warm_quotes()
+    if not setup_database():
+        print("Database setup failed. Exiting.")
+        sys.exit(1)
+    get_ledger().load()
+    
+    sync_stock_metadata(symbols)
+    scheduler = RefreshScheduler().load(symbols)
+    print(f"Scheduled {len(symbols)} symbols by exchange session close")
+    reload_interval = SCHEDULER_CONFIG['universe_reload_minutes'] * 60
+    next_reload = time.monotonic() + reload_interval
+    
+    while not stop.is_set():
+        if time.monotonic() >= next_reload:
+            reload_universe(scheduler)
+            next_reload = time.monotonic() + reload_interval
+        
+        due = scheduler.pop_due()
+        if not due:
+            wait = scheduler.seconds_until_next()
+            stop.wait(SCHEDULER_CONFIG['poll_interval'] if wait is None else min(wait, SCHEDULER_CONFIG['poll_interval']))
+            continue
+        
+        start_run_deadline()
+        planned, history_days, deferred = plan_run(due)
+        for symbol in deferred:
+            scheduler.defer_to_next_day(symbol)
+        
+        pending = set(planned)
+        
+        def on_stored(symbol, success):
+            pending.discard(symbol)
+            scheduler.reschedule(symbol, success)
+        
+        print(f"\n🕒 Refreshing {len(planned)} symbols: {', '.join(planned)}")
+        _, successful, _ = run_pipeline(itertools.takewhile(lambda _: not stop.is_set(), planned),
+                                        history_days, on_stored)
+        
+        # Symbols cut off by the deadline or a shutdown never reached the store stage
+        for symbol in pending:
+            scheduler.reschedule(symbol, False)
+        
+        if successful and not refresh_dashboard_view():
+            print("⚠️  Dashboard view refresh failed")
+        get_ledger().flush()
+    
+    print("Daemon stopped.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="FMP stock analysis pipeline")
+    parser.add_argument('--sync-metadata', action='store_true',
+                        help="sync company profiles into the stocks table and exit")
+    parser.add_argument('--export', nargs='?', const='', metavar='DIR',
+                        help="export tables to DIR (default EXPORT_CONFIG['directory']) and exit")
+    parser.add_argument('--export-format', choices=['csv', 'parquet'],
+                        help="file format for --export")
+    parser.add_argument('--train-payload-dictionary', action='store_true',
+                        help="train a zstd dictionary on stored raw_data payloads and exit")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running and refresh each symbol shortly after its exchange session closes")
+    parser.add_argument('--profile', action='store_true',
+                        help="profile the run (cProfile, per-stage timings, tracemalloc) into logs/")
+    parser.add_argument('--profile-sampling', nargs='?', type=float, const=5.0, metavar='MS',
+                        help="with --profile, also sample stacks every MS milliseconds for flamegraphs")
+    parser.add_argument('--export-tables', nargs='+', choices=sorted(EXPORT_QUERIES),
+                        help="tables for --export (default: all)")
+    return parser.parse_args(argv)
 
 def main():
     """Main execution function"""
+    args = parse_args()
+    if not args.profile:
+        return run(args)
+    
+    from pipeline.profiling import start_profiling
+    profiler = start_profiling(args.profile_sampling)
+    try:
+        return run(args)
+    finally:
+        profiler.stop()
+
+def run(args):
+    """Run the requested job: metadata sync, export, the daemon, or the full analysis pipeline"""
     try:
+        if args.sync_metadata:
+            sync_metadata_job()
+            return
+        
+        if args.export is not None:
+            export_job(args.export or None, args.export_format, args.export_tables)
+            return
+        
+        if args.train_payload_dictionary:
+            train_dictionary_job()
+            return
+        
+        if args.daemon:
+            daemon_job()
+            return
+        
         print("Starting FMP Stock Analysis Project...")
-        print(f"Processing {len(STOCK_SYMBOLS)} stocks: {', '.join(STOCK_SYMBOLS)}")
+        start_run_deadline()
+        print(f"Symbol universe source: {UNIVERSE_CONFIG['source']}")
         
-        if not test_connections():
+        first_symbol, symbols = peek(iter_universe())
+        
+        if not test_connections(first_symbol):
             print("Connection tests failed. Exiting.")
             sys.exit(1)
         
         if not setup_database():
             print("Database setup failed. Exiting.")
             sys.exit(1)
+        get_ledger().load()
         
-        total_stocks = len(STOCK_SYMBOLS)
-        successful_analyses = 0
-        failed_stocks = []
-        start_time = datetime.now()
+        symbols, history_days, deferred = plan_run(symbols)
         
-        for i, symbol in enumerate(STOCK_SYMBOLS, 1):
-            print(f"\n[{i}/{total_stocks}] Processing {symbol}")
-            
-            try:
-                if process_single_stock(symbol):
-                    successful_analyses += 1
-                else:
-                    failed_stocks.append(symbol)
-            except Exception:
-                failed_stocks.append(symbol)
-            
-            if i < total_stocks:
-                time.sleep(5)
+        start_time = datetime.now()
+        total_stocks, successful_analyses, failed_stocks = run_pipeline(symbols, history_days)
         
         end_time = datetime.now()
         total_duration = end_time - start_time
-        stocks_with_data = get_stocks_with_data()
+        success_rate = (successful_analyses / total_stocks) * 100 if total_stocks else 0.0
         
         print(f"\n{'='*60}")
         print("FINAL SUMMARY")
@@ -149,12 +446,16 @@ def main():
         print(f"⏱️  Duration: {total_duration}")
         print(f"📊 Total Stocks: {total_stocks}")
         print(f"✅ Successful: {successful_analyses}")
-        print(f"❌ Failed: {len(failed_stocks)}")
-        print(f"📈 Success Rate: {(successful_analyses/total_stocks)*100:.1f}%")
-        print(f"💾 Stocks with Data: {len(stocks_with_data)}")
+        print(f"❌ Failed: {total_stocks - successful_analyses}")
+        print(f"📈 Success Rate: {success_rate:.1f}%")
+        print(f"💾 Stocks with Data: {count_stocks()}")
+        print(f"⏳ Deferred (quota): {len(deferred)}")
         
         if failed_stocks:
-            print(f"Failed: {', '.join(failed_stocks)}")
+            print(f"Failed (most recent): {', '.join(failed_stocks)}")
+        
+        if successful_analyses > 0 and not refresh_dashboard_view():
+            print("⚠️  Dashboard view refresh failed")
         
         if successful_analyses > 0:
             print("🎉 Process completed successfully!")
@@ -167,6 +468,8 @@ def main():
     except Exception as e:
         print(f"Critical error: {e}")
         sys.exit(1)
+    finally:
+        get_ledger().flush()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
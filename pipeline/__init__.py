@@ -0,0 +1 @@
+# Pipeline orchestration package
\ No newline at end of file
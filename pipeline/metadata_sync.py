@@ -0,0 +1,99 @@
+import json
+import math
+import os
+import time
+from config import METADATA_CONFIG
+from data_extraction.fmp_fetcher import fetch_fmp_profiles
+from database.stocks_handler import bulk_upsert_stocks, extract_stock_info_from_profile
+
+_profile_cache = None
+
+def load_profile_cache():
+    """Load the on-disk profile cache once per process"""
+    global _profile_cache
+    if _profile_cache is None:
+        try:
+            with open(METADATA_CONFIG['cache_path'], encoding='utf-8') as handle:
+                _profile_cache = json.load(handle)
+        except Exception:
+            _profile_cache = {}
+    return _profile_cache
+
+def save_profile_cache():
+    """Write the profile cache atomically so an interrupted run never corrupts it"""
+    try:
+        path = METADATA_CONFIG['cache_path']
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump(load_profile_cache(), handle)
+        os.replace(tmp_path, path)
+        return True
+    except Exception:
+        return False
+
+def is_fresh(entry, now):
+    """Check whether a cached profile (or cached miss) is still within its TTL"""
+    if not entry:
+        return False
+    
+    ttl_days = METADATA_CONFIG['cache_ttl_days'] if entry.get('profile') else METADATA_CONFIG['missing_ttl_days']
+    return now - entry.get('fetched_at', 0) < ttl_days * 86400
+
+def count_profile_calls(symbols):
+    """Upper bound on the FMP profile requests syncing symbols batch by batch will make"""
+    cache = load_profile_cache()
+    now = time.time()
+    stale = sum(1 for symbol in symbols if not is_fresh(cache.get(symbol), now))
+    return min(stale, math.ceil(len(symbols) / METADATA_CONFIG['batch_size']))
+
+def refresh_profiles(symbols):
+    """Fetch stale or missing profiles in multi-symbol batches and update the cache"""
+    cache = load_profile_cache()
+    now = time.time()
+    stale = [symbol for symbol in symbols if not is_fresh(cache.get(symbol), now)]
+    batch_size = METADATA_CONFIG['batch_size']
+    
+    updated = False
+    for i in range(0, len(stale), batch_size):
+        batch = stale[i:i + batch_size]
+        profiles = fetch_fmp_profiles(batch)
+        if profiles is None:
+            continue
+        
+        for symbol in batch:
+            cache[symbol] = {'fetched_at': now, 'profile': profiles.get(symbol)}
+        updated = True
+    
+    if updated:
+        save_profile_cache()
+    return cache
+
+def sync_stock_metadata(symbols):
+    """Refresh cached profiles for symbols and upsert all of them into stocks in one statement"""
+    try:
+        symbols = list(symbols)
+        cache = refresh_profiles(symbols)
+        
+        rows = [extract_stock_info_from_profile(symbol, (cache.get(symbol) or {}).get('profile'))
+                for symbol in symbols]
+        return bulk_upsert_stocks(rows)
+    except Exception:
+        return False
+
+def iter_with_metadata(symbols, batch_size=None):
+    """Sync metadata one batch at a time as symbols stream past, keeping it off the per-symbol path"""
+    batch_size = batch_size or METADATA_CONFIG['batch_size']
+    batch = []
+    
+    for symbol in symbols:
+        batch.append(symbol)
+        if len(batch) >= batch_size:
+            sync_stock_metadata(batch)
+            yield from batch
+            batch = []
+    
+    if batch:
+        sync_stock_metadata(batch)
+        yield from batch
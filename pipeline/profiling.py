@@ -0,0 +1,239 @@
+import cProfile
+import functools
+import importlib
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from datetime import datetime
+from config import PROFILE_CONFIG
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (stage, module, attribute) entry points timed as pipeline stages; 'Class.method' patches the class
+STAGE_TARGETS = [
+    ('fetch', 'data_extraction.fmp_fetcher', 'request_fmp'),
+    ('fetch', 'data_extraction.history', 'parse_historical_stream'),
+    ('serialize', 'database.raw_data_handler', 'convert_data'),
+    ('db', 'database.db_connection', 'DatabaseConnection.connect'),
+    ('db', 'database.db_connection', 'DatabaseConnection.execute_query'),
+    ('db', 'database.db_connection', 'DatabaseConnection.fetch_all'),
+    ('indicators', 'llm_analysis.indicators', 'compute_universe_indicators'),
+    ('indicators', 'llm_analysis.timeframes', 'compute_universe_timeframes'),
+    ('prompt', 'llm_analysis.prompt_processor', 'create_batch_analysis_prompt'),
+    ('llm', 'llm_analysis.groq_analyzer', 'create_completion'),
+    ('parse', 'llm_analysis.prompt_processor', 'parse_batch_response'),
+    ('parse', 'llm_analysis.groq_analyzer', 'fallback_parse_response')
+]
+
+class PipelineProfiler:
+    """Profiles one run: cProfile in every thread, per-stage timings, tracemalloc and optional sampling.
+
+    Nothing is patched or hooked until start(), so runs without --profile pay nothing.
+    """
+    
+    def __init__(self, output_dir, sample_interval=None):
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.lock = threading.Lock()
+        self.profiles = []
+        self.patches = []
+        self.stage_stacks = {}
+        self.stage_times = defaultdict(list)
+        self.samples = Counter()
+        self.stage_samples = defaultdict(Counter)
+        self.sampling = False
+        self.sampler = None
+    
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        tracemalloc.start(PROFILE_CONFIG['traceback_frames'])
+        self.instrument()
+        
+        threading.setprofile(self.profile_new_thread)
+        self.profile_new_thread()
+        
+        if self.sample_interval:
+            self.sampling = True
+            self.sampler = threading.Thread(target=self.sample_loop, daemon=True)
+            self.sampler.start()
+        return self
+    
+    def stop(self):
+        self.sampling = False
+        if self.sampler:
+            self.sampler.join()
+        
+        threading.setprofile(None)
+        for profile in self.profiles:
+            profile.disable()
+        self.restore()
+        
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        
+        self.write_pstats()
+        self.write_stage_summary()
+        self.write_allocations(snapshot, current, peak)
+        if self.sample_interval:
+            self.write_collapsed()
+        print(f"📈 Profile written to {self.output_dir}")
+    
+    def profile_new_thread(self, *args):
+        """Installed via threading.setprofile: swap the bootstrap hook for a per-thread cProfile"""
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        with self.lock:
+            self.profiles.append(profile)
+        profile.enable()
+    
+    def instrument(self):
+        """Wrap every stage entry point, including names already imported into other project modules"""
+        for stage, module_name, attribute in STAGE_TARGETS:
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                continue
+            
+            owner = module
+            name = attribute
+            if '.' in attribute:
+                class_name, name = attribute.split('.', 1)
+                owner = getattr(module, class_name)
+            
+            original = getattr(owner, name)
+            wrapped = self.wrap(stage, original)
+            self.patch(owner, name, original, wrapped)
+            
+            if owner is module:
+                for other in list(sys.modules.values()):
+                    if other is not module and self.is_project_module(other):
+                        for key, value in list(vars(other).items()):
+                            if value is original:
+                                self.patch(other, key, original, wrapped)
+    
+    def patch(self, owner, name, original, wrapped):
+        self.patches.append((owner, name, original))
+        setattr(owner, name, wrapped)
+    
+    def restore(self):
+        for owner, name, original in reversed(self.patches):
+            setattr(owner, name, original)
+        self.patches = []
+    
+    @staticmethod
+    def is_project_module(module):
+        path = getattr(module, '__file__', None) or ''
+        return path.startswith(PROJECT_ROOT) and 'site-packages' not in path
+    
+    def wrap(self, stage, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            stack = self.stage_stacks.setdefault(threading.get_ident(), [])
+            if stack and stack[-1] == stage:
+                return func(*args, **kwargs)
+            
+            stack.append(stage)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                stack.pop()
+                with self.lock:
+                    self.stage_times[stage].append(elapsed)
+        return wrapper
+    
+    def sample_loop(self):
+        """Record collapsed stacks of every thread, attributed to the innermost active stage"""
+        own_id = threading.get_ident()
+        while self.sampling:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                collapsed = ';'.join(reversed(stack))
+                
+                self.samples[collapsed] += 1
+                stages = self.stage_stacks.get(thread_id)
+                if stages:
+                    self.stage_samples[stages[-1]][collapsed] += 1
+            time.sleep(self.sample_interval)
+    
+    def write_pstats(self):
+        stats = None
+        for profile in self.profiles:
+            try:
+                if stats is None:
+                    stats = pstats.Stats(profile)
+                else:
+                    stats.add(profile)
+            except TypeError:
+                continue  # thread never recorded any calls
+        if stats is not None:
+            stats.dump_stats(os.path.join(self.output_dir, 'run.pstats'))
+    
+    def write_stage_summary(self):
+        summary = {}
+        for stage, times in sorted(self.stage_times.items()):
+            summary[stage] = {
+                'calls': len(times),
+                'total_s': round(sum(times), 4),
+                'mean_ms': round(sum(times) / len(times) * 1000, 2),
+                'max_ms': round(max(times) * 1000, 2)
+            }
+        
+        with open(os.path.join(self.output_dir, 'stages.json'), 'w', encoding='utf-8') as handle:
+            json.dump(summary, handle, indent=2)
+        with open(os.path.join(self.output_dir, 'stages.txt'), 'w', encoding='utf-8') as handle:
+            handle.write(f"{'stage':<12}{'calls':>8}{'total_s':>10}{'mean_ms':>10}{'max_ms':>10}\n")
+            for stage, row in summary.items():
+                handle.write(f"{stage:<12}{row['calls']:>8}{row['total_s']:>10}{row['mean_ms']:>10}{row['max_ms']:>10}\n")
+    
+    def write_allocations(self, snapshot, current, peak):
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            # Modules imported lazily during the run would otherwise top the list
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*>')
+        ])
+        top = PROFILE_CONFIG['top_allocations']
+        
+        with open(os.path.join(self.output_dir, 'allocations.txt'), 'w', encoding='utf-8') as handle:
+            handle.write(f"Traced memory: current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n")
+            handle.write(f"Top {top} allocation sites by line:\n")
+            for stat in snapshot.statistics('lineno')[:top]:
+                handle.write(f"{stat}\n")
+            
+            handle.write(f"\nTop {top} allocation tracebacks:\n")
+            for stat in snapshot.statistics('traceback')[:top]:
+                handle.write(f"\n{stat.count} blocks, {stat.size / 1024:.1f} KiB\n")
+                for line in stat.traceback.format():
+                    handle.write(f"{line}\n")
+    
+    def write_collapsed(self):
+        """Write Brendan Gregg collapsed stacks (flamegraph.pl, speedscope) for the run and each stage"""
+        def dump(path, counter):
+            with open(path, 'w', encoding='utf-8') as handle:
+                for stack, count in counter.most_common():
+                    handle.write(f"{stack} {count}\n")
+        
+        dump(os.path.join(self.output_dir, 'run.collapsed'), self.samples)
+        for stage, counter in self.stage_samples.items():
+            dump(os.path.join(self.output_dir, f"stage-{stage}.collapsed"), counter)
+
+def start_profiling(sample_interval_ms=None):
+    """Start profiling into a timestamped directory under PROFILE_CONFIG['output_dir']"""
+    output_dir = os.path.join(PROFILE_CONFIG['output_dir'], f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}")
+    interval = sample_interval_ms / 1000 if sample_interval_ms else None
+    return PipelineProfiler(output_dir, interval).start()
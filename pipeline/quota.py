@@ -0,0 +1,172 @@
+import threading
+from datetime import datetime, timezone
+from config import DATA_LIMITS, INDICATOR_CONFIG, MODEL_TIERS, QUOTA_CONFIG, SYMBOL_PRIORITIES
+from database.answers_handler import get_last_answer_times
+from database.quota_handler import add_usage, ensure_quota_table, get_usage
+
+class QuotaLedger:
+    """Per-provider daily call and token counters, buffered in memory and flushed to api_usage.
+    
+    Database I/O (loading, roll-over, flushes) runs under io_lock, never under
+    lock, so fetch and Groq threads are not held up by a slow database. Usage
+    recorded before load() is buffered and counted towards the loaded day.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.io_lock = threading.Lock()
+        self.usage_date = None
+        self.stored = {}
+        self.pending = {}
+        self.pending_calls = 0
+    
+    def loaded(self):
+        return self.usage_date is not None
+    
+    def load(self):
+        """Load today's persisted usage; called once the database is set up"""
+        self._roll_over()
+    
+    def _roll_over(self):
+        """Switch to today's counters, flushing the previous day's usage first"""
+        today = datetime.now(timezone.utc).date()
+        if self.usage_date == today:
+            return
+        
+        with self.io_lock:
+            if self.usage_date == today:
+                return
+            if self.usage_date is not None:
+                self._flush_pending()
+            ensure_quota_table()
+            stored = get_usage(today)
+            with self.lock:
+                self.usage_date = today
+                self.stored = stored
+    
+    def _flush_pending(self):
+        """Write pending usage to api_usage (call with io_lock held); failed writes stay pending"""
+        with self.lock:
+            usage_date, pending = self.usage_date, self.pending
+            self.pending = {}
+            self.pending_calls = 0
+        
+        written = {
+            provider for provider, usage in pending.items()
+            if (usage['calls'] or usage['tokens']) and add_usage(provider, usage_date, usage['calls'], usage['tokens'])
+        }
+        
+        with self.lock:
+            for provider, usage in pending.items():
+                if not (usage['calls'] or usage['tokens']):
+                    continue
+                target = self.stored if provider in written else self.pending
+                totals = target.setdefault(provider, {'calls': 0, 'tokens': 0})
+                totals['calls'] += usage['calls']
+                totals['tokens'] += usage['tokens']
+                if provider not in written:
+                    self.pending_calls += usage['calls']
+    
+    def record(self, provider, calls=1, tokens=0):
+        if self.loaded():
+            self._roll_over()
+        with self.lock:
+            usage = self.pending.setdefault(provider, {'calls': 0, 'tokens': 0})
+            usage['calls'] += calls
+            usage['tokens'] += tokens
+            self.pending_calls += calls
+            should_flush = self.loaded() and self.pending_calls >= QUOTA_CONFIG['flush_every']
+        if should_flush:
+            self.flush()
+    
+    def used(self, provider):
+        """Return (calls, tokens) used today, including unflushed usage"""
+        self._roll_over()
+        with self.lock:
+            stored = self.stored.get(provider, {})
+            pending = self.pending.get(provider, {})
+            return (stored.get('calls', 0) + pending.get('calls', 0),
+                    stored.get('tokens', 0) + pending.get('tokens', 0))
+    
+    def remaining_calls(self, provider):
+        calls, _ = self.used(provider)
+        return QUOTA_CONFIG[f'{provider}_daily_calls'] - calls
+    
+    def remaining_tokens(self, provider):
+        _, tokens = self.used(provider)
+        return QUOTA_CONFIG[f'{provider}_daily_tokens'] - tokens
+    
+    def flush(self):
+        with self.io_lock:
+            if self.usage_date is not None:
+                self._flush_pending()
+
+_ledger = QuotaLedger()
+
+def get_ledger():
+    return _ledger
+
+def record_usage(provider, calls=1, tokens=0):
+    try:
+        _ledger.record(provider, calls, tokens)
+    except Exception:
+        pass
+
+def has_call_budget(provider):
+    """Whether another call to the provider fits in today's quota.
+
+    Fails open if the ledger is unavailable or not loaded yet, so the startup
+    probes never wait on the database.
+    """
+    try:
+        return not _ledger.loaded() or _ledger.remaining_calls(provider) > 0
+    except Exception:
+        return True
+
+def overhead_fmp_calls(symbols):
+    """FMP calls a run makes besides the per-symbol fetches: profile syncs for stale
+    profiles, today's benchmark history and the refetches reserved for retries"""
+    from data_extraction.fmp_fetcher import benchmark_history_cached
+    from pipeline.metadata_sync import count_profile_calls
+    
+    benchmark_calls = 0 if benchmark_history_cached(INDICATOR_CONFIG['benchmark_symbol']) else 1
+    return count_profile_calls(symbols) + benchmark_calls + QUOTA_CONFIG['retry_fetch_calls']
+
+def plan_run(symbols):
+    """Order symbols by priority then staleness and fit them into today's remaining quota.
+
+    Returns (ordered_symbols, history_days, deferred): history_days maps symbols
+    planned without a fresh history call (0 = quote only, stored history is reused)
+    and deferred lists symbols left for a later run.
+
+    Ordering by staleness needs every symbol, so the universe's tickers are held
+    in memory here (the stream stays lazy for payloads, which are fetched per
+    symbol); get_last_answer_times already holds one timestamp per answered symbol.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    last_answered = get_last_answer_times()
+    never = datetime.min
+    
+    def staleness_key(symbol):
+        answered = last_answered.get(symbol)
+        if answered is not None and answered.tzinfo is not None:
+            answered = answered.replace(tzinfo=None)
+        return (-SYMBOL_PRIORITIES.get(symbol, 0), answered or never)
+    
+    ordered = sorted(symbols, key=staleness_key)
+    
+    fmp_budget = max(0, _ledger.remaining_calls('fmp') - QUOTA_CONFIG['reserve_calls'] - overhead_fmp_calls(ordered))
+    groq_budget = min(_ledger.remaining_calls('groq') // len(MODEL_TIERS),
+                      _ledger.remaining_tokens('groq') // QUOTA_CONFIG['groq_tokens_per_symbol'])
+    
+    # Each symbol needs one Groq call per model tier and at least the quote call;
+    # history costs one more FMP call
+    planned = ordered[:max(0, min(len(ordered), fmp_budget, groq_budget))]
+    deferred = ordered[len(planned):]
+    full_history = max(0, fmp_budget - len(planned))
+    history_days = {symbol: 0 for symbol in planned[full_history:]}
+    
+    if history_days or deferred:
+        print(f"📉 Quota plan: {len(planned) - len(history_days)} full, {len(history_days)} quote-only "
+              f"(stored history, {DATA_LIMITS['historical_days']}-day refresh skipped), {len(deferred)} deferred")
+    return planned, history_days, deferred
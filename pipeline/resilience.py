@@ -0,0 +1,138 @@
+import threading
+import time
+from config import RESILIENCE_CONFIG
+
+class ProviderError(Exception):
+    """A provider call that failed or was skipped.
+
+    transient errors (no response, rate limiting, server errors, an open
+    circuit) may succeed later in the same run; permanent ones (bad request,
+    unknown symbol, spent quota, expired deadline) will not. sent is False when
+    an open circuit stopped the call before it reached the provider.
+    """
+    
+    def __init__(self, provider, message, status_code=None, transient=True, sent=True):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.status_code = status_code
+        self.transient = transient
+        self.sent = sent
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker shared by every caller of one provider.
+
+    After failure_threshold consecutive failures the breaker opens and calls are
+    rejected immediately. Once reset_timeout has passed a single trial call is let
+    through (half-open); its outcome closes or re-opens the breaker.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name, failure_threshold=None, reset_timeout=None):
+        self.name = name
+        self.failure_threshold = failure_threshold or RESILIENCE_CONFIG['failure_threshold']
+        self.reset_timeout = reset_timeout or RESILIENCE_CONFIG['reset_timeout']
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+    
+    def allow_request(self):
+        """Return True if a call may proceed; in half-open state only one trial call is allowed"""
+        with self.lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.trial_in_flight = False
+            
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+    
+    def is_available(self):
+        """Check without claiming the half-open trial call"""
+        with self.lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return True
+    
+    def available_at(self):
+        """Monotonic time from which a call may go through: now unless open, else when the trial is allowed"""
+        with self.lock:
+            if self.state == self.OPEN:
+                return self.opened_at + self.reset_timeout
+            return time.monotonic()
+    
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.trial_in_flight = False
+    
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"⚠️  {self.name} circuit opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+class RunDeadline:
+    """Total time budget for a run; per-call timeouts are capped by what is left"""
+    
+    def __init__(self, seconds=None):
+        self.expires_at = time.monotonic() + seconds if seconds else None
+    
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining < RESILIENCE_CONFIG['min_call_timeout']
+    
+    def timeout(self, default):
+        """Per-call timeout: the default, capped by the remaining run budget"""
+        remaining = self.remaining()
+        return default if remaining is None else min(default, remaining)
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_run_deadline = RunDeadline()
+
+def get_breaker(provider):
+    """Return the process-wide circuit breaker for a provider ('fmp', 'groq', ...)"""
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+def provider_available_at(provider):
+    """Monotonic time from which the provider's breaker lets a call through (0 without a breaker)"""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+    return breaker.available_at() if breaker else 0.0
+
+def start_run_deadline(seconds=None):
+    """Start the global run deadline; seconds defaults to RESILIENCE_CONFIG['run_deadline']"""
+    global _run_deadline
+    _run_deadline = RunDeadline(seconds if seconds is not None else RESILIENCE_CONFIG['run_deadline'])
+    return _run_deadline
+
+def get_run_deadline():
+    return _run_deadline
+
+def is_provider_failure(status_code):
+    """Whether an outcome says the provider is unhealthy: no response, rate limited or 5xx"""
+    return status_code is None or status_code == 429 or status_code >= 500
+
+def is_transient_status(status_code):
+    """Whether a failed call is worth retrying later: provider failures plus request timeouts"""
+    return is_provider_failure(status_code) or status_code in (408, 425)
@@ -0,0 +1,60 @@
+import heapq
+import itertools
+import time
+from config import RETRY_CONFIG
+from pipeline.resilience import ProviderError, get_run_deadline, provider_available_at
+
+def backoff_delay(attempts):
+    """Seconds to wait before the next attempt after `attempts` tries"""
+    return RETRY_CONFIG['backoff_base'] * RETRY_CONFIG['backoff_factor'] ** (max(attempts, 1) - 1)
+
+class RetryQueue:
+    """Delayed retries for pipeline items that failed transiently, drained after the main pass.
+    
+    Items keep whatever their earlier stages produced (fetched payload,
+    indicators, partial answers), so a retry only repeats the stage that failed.
+    The queue is bounded so a provider outage cannot pin every payload in memory.
+    """
+    
+    def __init__(self, max_size=None):
+        self.heap = []
+        self.order = itertools.count()
+        self.max_size = max_size or RETRY_CONFIG['max_queued']
+    
+    def __len__(self):
+        return len(self.heap)
+    
+    def push(self, item):
+        """Queue an item for its next attempt; False when the queue is full.
+        
+        The attempt waits for the backoff delay and, when the failing provider's
+        circuit is open, until the breaker lets a half-open trial through.
+        """
+        if len(self.heap) >= self.max_size:
+            return False
+        ready_at = time.monotonic() + backoff_delay(item['attempts'])
+        error = item.get('error')
+        if error is not None:
+            ready_at = max(ready_at, provider_available_at(error.provider))
+        heapq.heappush(self.heap, (ready_at, next(self.order), item))
+        return True
+    
+    def drain(self, retry):
+        """Yield retry(item) for each queued item once its delay has passed, including items pushed meanwhile.
+        
+        Items still waiting when the run deadline expires are yielded unretried
+        with a permanent error, so callers can record them as failed.
+        """
+        while self.heap:
+            ready_at, _, item = heapq.heappop(self.heap)
+            deadline = get_run_deadline()
+            
+            wait = ready_at - time.monotonic()
+            if wait > 0 and not deadline.expired():
+                time.sleep(deadline.timeout(wait))
+            
+            if deadline.expired():
+                item['error'] = ProviderError('pipeline', "run deadline reached before retry", transient=False)
+                yield item
+                continue
+            yield retry(item)
@@ -0,0 +1,119 @@
+import heapq
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from config import COUNTRY_SESSIONS, EXCHANGE_SESSIONS, SCHEDULER_CONFIG, SYMBOL_PRIORITIES
+from database.answers_handler import get_last_answer_times
+from database.stocks_handler import iter_all_stocks
+
+def session_for(stock):
+    """Pick the session a stock follows: its listing exchange, then its country, then the default"""
+    stock = stock or {}
+    exchange = (stock.get('exchange') or '').upper()
+    if exchange in EXCHANGE_SESSIONS:
+        return exchange
+    return COUNTRY_SESSIONS.get((stock.get('country') or '').upper(), SCHEDULER_CONFIG['default_session'])
+
+def session_close(session, day):
+    """UTC datetime of a session's close on a local trading day"""
+    zone, close = EXCHANGE_SESSIONS[session]
+    hour, minute = map(int, close.split(':'))
+    return datetime.combine(day, time(hour, minute), tzinfo=ZoneInfo(zone)).astimezone(timezone.utc)
+
+def iter_session_closes(session, now, step):
+    """Yield weekday closes walking from now's local day in step (+1/-1 days)"""
+    day = now.astimezone(ZoneInfo(EXCHANGE_SESSIONS[session][0])).date()
+    while True:
+        if day.weekday() < 5:
+            yield session_close(session, day)
+        day += timedelta(days=step)
+
+def last_refresh_time(session, now):
+    """Latest refresh slot (session close + refresh delay) at or before now"""
+    delay = timedelta(minutes=SCHEDULER_CONFIG['refresh_delay_minutes'])
+    return next(close for close in iter_session_closes(session, now - delay, -1) if close + delay <= now) + delay
+
+def next_refresh_time(session, now):
+    """First refresh slot strictly after now"""
+    delay = timedelta(minutes=SCHEDULER_CONFIG['refresh_delay_minutes'])
+    return next(close for close in iter_session_closes(session, now - delay, 1) if close + delay > now) + delay
+
+def as_utc(timestamp):
+    """Naive database timestamps are UTC"""
+    if timestamp is None or timestamp.tzinfo is not None:
+        return timestamp
+    return timestamp.replace(tzinfo=timezone.utc)
+
+class RefreshScheduler:
+    """Min-heap of (due_at, -priority, symbol).
+    
+    A symbol whose last answer predates its latest refresh slot is due at that
+    (past) slot, so the stalest data sorts first; fresh symbols wait for the
+    slot after their exchange's next close.
+    """
+    
+    def __init__(self):
+        self.heap = []
+        self.sessions = {}
+    
+    def load(self, symbols, now=None):
+        """Schedule symbols from their stored exchange/country and last answer times"""
+        now = now or datetime.now(timezone.utc)
+        symbols = list(dict.fromkeys(symbols))
+        wanted = set(symbols)
+        stocks = {stock['symbol']: stock for stock in iter_all_stocks() if stock['symbol'] in wanted}
+        last_answered = get_last_answer_times()
+        
+        for symbol in symbols:
+            session = self.sessions[symbol] = session_for(stocks.get(symbol))
+            ready = last_refresh_time(session, now)
+            answered = as_utc(last_answered.get(symbol))
+            self.push(symbol, ready if answered is None or answered < ready else next_refresh_time(session, now))
+        return self
+    
+    def update(self, symbols, now=None):
+        """Follow a reloaded universe: schedule new symbols and drop removed ones; returns (added, removed)"""
+        symbols = list(dict.fromkeys(symbols))
+        wanted = set(symbols)
+        removed = [symbol for symbol in self.sessions if symbol not in wanted]
+        if removed:
+            for symbol in removed:
+                del self.sessions[symbol]
+            self.heap = [entry for entry in self.heap if entry[2] in wanted]
+            heapq.heapify(self.heap)
+        
+        added = [symbol for symbol in symbols if symbol not in self.sessions]
+        if added:
+            self.load(added, now)
+        return added, removed
+    
+    def push(self, symbol, due_at):
+        heapq.heappush(self.heap, (due_at, -SYMBOL_PRIORITIES.get(symbol, 0), symbol))
+    
+    def pop_due(self, now=None, limit=None):
+        """Pop up to limit symbols whose refresh slot has passed, most overdue first"""
+        now = now or datetime.now(timezone.utc)
+        limit = limit or SCHEDULER_CONFIG['max_batch']
+        due = []
+        while self.heap and self.heap[0][0] <= now and len(due) < limit:
+            due.append(heapq.heappop(self.heap)[2])
+        return due
+    
+    def seconds_until_next(self, now=None):
+        if not self.heap:
+            return None
+        now = now or datetime.now(timezone.utc)
+        return max(0.0, (self.heap[0][0] - now).total_seconds())
+    
+    def reschedule(self, symbol, refreshed, now=None):
+        """Refreshed symbols wait for their next close; failures retry sooner, but never past it"""
+        now = now or datetime.now(timezone.utc)
+        next_slot = next_refresh_time(self.sessions.get(symbol, SCHEDULER_CONFIG['default_session']), now)
+        if refreshed:
+            self.push(symbol, next_slot)
+        else:
+            self.push(symbol, min(next_slot, now + timedelta(minutes=SCHEDULER_CONFIG['retry_minutes'])))
+    
+    def defer_to_next_day(self, symbol, now=None):
+        """Quota-deferred symbols come back when the UTC day (and the quota) rolls over"""
+        now = now or datetime.now(timezone.utc)
+        self.push(symbol, datetime.combine(now.date() + timedelta(days=1), time(), tzinfo=timezone.utc))
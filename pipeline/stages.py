@@ -0,0 +1,75 @@
+import itertools
+import queue
+import threading
+import time
+from config import PIPELINE_CONFIG
+
+_DONE = object()
+
+class _StageError:
+    def __init__(self, error):
+        self.error = error
+
+class StageOutput:
+    """Iterator over a stage's results"""
+    
+    def __init__(self, results):
+        self.results = results
+        self.done = False
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        if self.done:
+            raise StopIteration
+        return self._unwrap(self.results.get())
+    
+    def _unwrap(self, result):
+        if result is _DONE:
+            self.done = True
+            raise StopIteration
+        if isinstance(result, _StageError):
+            self.done = True
+            raise result.error
+        return result
+
+def run_stage(items, func, maxsize=None):
+    """Apply func to each item in a worker thread and return its results through a bounded queue.
+
+    The queue blocks the worker once maxsize results are waiting, so a slow
+    downstream stage throttles the upstream one instead of letting results pile up.
+    """
+    results = queue.Queue(maxsize=maxsize or PIPELINE_CONFIG['queue_size'])
+    
+    def worker():
+        try:
+            for item in items:
+                results.put(func(item))
+        except BaseException as e:
+            results.put(_StageError(e))
+        finally:
+            results.put(_DONE)
+    
+    threading.Thread(target=worker, daemon=True).start()
+    return StageOutput(results)
+
+def throttle(items, delay):
+    """Yield items with a pause between them to respect provider rate limits.
+
+    delay is a number of seconds or a callable returning one, evaluated before each pause.
+    """
+    for i, item in enumerate(items):
+        pause = delay() if callable(delay) else delay
+        if i and pause:
+            time.sleep(pause)
+        yield item
+
+def iter_batches(items, size):
+    """Group items into batches of size, waiting for each batch to fill; the last one may be smaller"""
+    items = iter(items)
+    while True:
+        batch = list(itertools.islice(items, size))
+        if not batch:
+            return
+        yield batch
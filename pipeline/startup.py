@@ -0,0 +1,56 @@
+import itertools
+from concurrent.futures import ThreadPoolExecutor, wait
+from config import STARTUP_CONFIG
+from data_extraction.fmp_fetcher import fetch_fmp_quote
+from database.db_connection import test_database_connection
+from llm_analysis.groq_analyzer import test_groq_connection
+
+_warm_quotes = {}
+
+def probe_fmp(symbol, timeout):
+    """Fetch the first symbol's quote as the FMP probe and keep it as real data"""
+    quote = fetch_fmp_quote(symbol, timeout)
+    if quote:
+        _warm_quotes[symbol] = quote
+    return bool(quote)
+
+def run_startup_checks(first_symbol, deadline=None, probe_timeout=None):
+    """Run DB, FMP and Groq probes concurrently, returning {'database', 'fmp', 'groq'} flags"""
+    deadline = deadline or STARTUP_CONFIG['deadline']
+    probe_timeout = probe_timeout or STARTUP_CONFIG['probe_timeout']
+    
+    executor = ThreadPoolExecutor(max_workers=3)
+    probes = {
+        'database': executor.submit(test_database_connection, max(2, int(probe_timeout))),
+        'groq': executor.submit(test_groq_connection, probe_timeout)
+    }
+    if first_symbol:
+        probes['fmp'] = executor.submit(probe_fmp, first_symbol, probe_timeout)
+    
+    wait(probes.values(), timeout=deadline)
+    executor.shutdown(wait=False, cancel_futures=True)
+    
+    results = {'database': False, 'fmp': False, 'groq': False}
+    for name, future in probes.items():
+        try:
+            results[name] = future.done() and bool(future.result())
+        except Exception:
+            results[name] = False
+    return results
+
+def take_warm_quote(symbol):
+    """Hand over a quote fetched during startup so the pipeline does not fetch it again"""
+    return _warm_quotes.pop(symbol, None)
+
+def clear_warm_quotes():
+    """Drop startup quotes that will not be used right away"""
+    _warm_quotes.clear()
+
+def peek(iterable):
+    """Return (first_item, iterator) without consuming the first item; first_item is None when empty"""
+    iterator = iter(iterable)
+    try:
+        first = next(iterator)
+    except StopIteration:
+        return None, iterator
+    return first, itertools.chain([first], iterator)
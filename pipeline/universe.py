@@ -0,0 +1,20 @@
+from config import STOCK_SYMBOLS, UNIVERSE_CONFIG
+from database.stocks_handler import iter_stock_symbols
+
+def iter_universe(source=None):
+    """Lazily yield the symbols to process from the configured universe source"""
+    source = source or UNIVERSE_CONFIG['source']
+    
+    if source == 'database':
+        return iter_stock_symbols(UNIVERSE_CONFIG['batch_size'])
+    if source == 'file':
+        return iter_symbols_from_file(UNIVERSE_CONFIG['file_path'])
+    return iter(STOCK_SYMBOLS)
+
+def iter_symbols_from_file(path):
+    """Yield one ticker per line, skipping blanks and # comments; CSV lines use the first column"""
+    with open(path, encoding='utf-8') as handle:
+        for line in handle:
+            symbol = line.split('#', 1)[0].split(',', 1)[0].strip().upper()
+            if symbol and symbol != 'SYMBOL':
+                yield symbol